@@ -1,13 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from fastapi import Depends, HTTPException, Query as QueryParam, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, String, select, tuple_, type_coerce
+from sqlalchemy.orm import Query, Session, joinedload
+from typing import List, Optional, Union
 
-from app.database import get_db
-from app.models.contact import Contact
-from app.schemas.contact import ContactCreate, ContactResponse
-from app.services.distribution import distribute_contact
+from app.api.export import EXPORT_MEDIA_TYPES, ExportFormat, iter_export
+from app.api.expand import expand_options, parse_expand
+from app.api.pagination import check_pagination, decode_cursor, set_next_cursor
+from app.api.responses import FastJSONResponse, rows_to_dicts
+from app.api.router import CRMRouter
+from app.database import ReadSessionLocal, get_db, get_read_db, to_sqlite_timestamp
+from app.models.contact import Contact, ContactStatus
+from app.schemas.contact import (
+    CONTACT_EXPANSIONS,
+    ContactCreate,
+    ContactResponse,
+    ContactBatchCreate,
+    ContactBatchItemResult,
+    ContactUpdate,
+    ContactCompleteRequest,
+    ContactCompleteResult,
+)
+from app.services.contact_lifecycle import complete_contacts
+from app.services.distribution import distribute_contact, distribute_contacts_batch
+from app.services.write_coalescer import ContactWriterStopped, contact_write_coalescer
 
-router = APIRouter(prefix="/api/contacts", tags=["contacts"])
+router = CRMRouter(prefix="/api/contacts", tags=["contacts"])
+
+# Колонки плоского ответа в порядке полей ContactResponse
+CONTACT_COLUMNS = (
+    Contact.status,
+    Contact.id,
+    Contact.lead_id,
+    Contact.source_id,
+    Contact.operator_id,
+    Contact.created_at,
+)
+CONTACT_FIELDS = tuple(column.key for column in CONTACT_COLUMNS)
+
+
+def filter_contacts(
+    query: Union[Query, Select],
+    operator_id: Optional[int] = None,
+    source_id: Optional[int] = None,
+    lead_id: Optional[int] = None
+) -> Union[Query, Select]:
+    """Применить фильтры списка обращений (к Query или select())"""
+    if operator_id is not None:
+        query = query.filter(Contact.operator_id == operator_id)
+    if source_id is not None:
+        query = query.filter(Contact.source_id == source_id)
+    if lead_id is not None:
+        query = query.filter(Contact.lead_id == lead_id)
+    return query
 
 
 @router.post("", response_model=ContactResponse, status_code=201)
@@ -25,15 +71,31 @@ def create_contact(
     - Создаст обращение
     """
     try:
-        created_contact = distribute_contact(
-            db=db,
-            external_id=contact.external_id,
-            source_code=contact.source_code
-        )
+        created_contact = None
+        if contact_write_coalescer.running:
+            # Групповая фиксация: обращение распределяется в пачке потоком-писателем
+            try:
+                created_contact = contact_write_coalescer.write(
+                    external_id=contact.external_id,
+                    source_code=contact.source_code
+                )
+            except ContactWriterStopped:
+                # Писатель остановился после проверки: распределяем сами
+                pass
+        if created_contact is None:
+            created_contact = distribute_contact(
+                db=db,
+                external_id=contact.external_id,
+                source_code=contact.source_code
+            )
         
-        # Загружаем связанные объекты для ответа
-        db.refresh(created_contact)
-        return created_contact
+        # Ответ со связями (лид, источник, оператор) — одним запросом с JOIN
+        return db.get(
+            Contact,
+            created_contact.id,
+            options=[joinedload(getattr(Contact, name)) for name in CONTACT_EXPANSIONS],
+            populate_existing=True,
+        )
         
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -41,44 +103,185 @@ def create_contact(
         raise HTTPException(status_code=500, detail=f"Ошибка при создании обращения: {str(e)}")
 
 
+@router.post("/batch", response_model=List[ContactBatchItemResult])
+def create_contacts_batch(
+    batch: ContactBatchCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    Зарегистрировать пачку обращений (например, накопившиеся сообщения ботов).
+    
+    Лиды, источники и доступность операторов определяются один раз на пачку,
+    все обращения создаются в одной транзакции. Результаты возвращаются
+    в порядке входных элементов: ID обращения и оператора либо ошибка.
+    """
+    try:
+        results = distribute_contacts_batch(
+            db=db,
+            items=[(item.external_id, item.source_code) for item in batch.items]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при создании обращений: {str(e)}")
+    
+    return [
+        ContactBatchItemResult(error=str(result))
+        if isinstance(result, ValueError)
+        else ContactBatchItemResult(contact_id=result.id, operator_id=result.operator_id)
+        for result in results
+    ]
+
+
+@router.post("/complete", response_model=ContactCompleteResult)
+def complete_contacts_bulk(
+    request: ContactCompleteRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Завершить активные обращения одним set-based UPDATE.
+    
+    Условия contact_ids, operator_id и older_than применяются вместе (нужно
+    хотя бы одно). Нагрузка операторов освобождается в той же транзакции.
+    """
+    result = complete_contacts(
+        db,
+        contact_ids=request.contact_ids,
+        operator_id=request.operator_id,
+        older_than=request.older_than
+    )
+    return ContactCompleteResult(
+        completed=result.completed,
+        released_by_operator=result.released_by_operator
+    )
+
+
 @router.get("", response_model=List[ContactResponse])
 def get_contacts(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     operator_id: int = None,
     source_id: int = None,
     lead_id: int = None,
-    db: Session = Depends(get_db)
+    expand: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
     """
-    Получить список обращений.
+    Получить список обращений (по возрастанию created_at, id).
     
     Поддерживает фильтрацию по:
     - operator_id: ID оператора
     - source_id: ID источника
     - lead_id: ID лида
+    
+    По умолчанию ответ плоский (только ID связей); expand=lead,source,operator
+    добавляет вложенные объекты — по одному запросу на связь для всей страницы.
+    
+    Для постраничного обхода используйте cursor: курсор следующей страницы
+    возвращается в заголовке X-Next-Cursor (нет заголовка — страница последняя).
+    В отличие от skip, глубокие страницы не требуют пропуска предыдущих строк.
     """
-    query = db.query(Contact)
+    check_pagination(skip, cursor)
+    expand_names = parse_expand(expand, CONTACT_EXPANSIONS)
+    # created_at сравнивается как хранится в SQLite (строкой), без
+    # преобразования в datetime: иначе формат параметра не совпадет с CURRENT_TIMESTAMP
+    created_at_key = type_coerce(Contact.created_at, String)
+    if expand_names:
+        query = db.query(Contact, created_at_key).options(*expand_options(Contact, expand_names))
+    else:
+        # Быстрый путь плоского ответа: кортежи колонок без ORM-объектов
+        # и без валидации response_model
+        query = db.query(*CONTACT_COLUMNS, created_at_key)
     
-    if operator_id is not None:
-        query = query.filter(Contact.operator_id == operator_id)
-    if source_id is not None:
-        query = query.filter(Contact.source_id == source_id)
-    if lead_id is not None:
-        query = query.filter(Contact.lead_id == lead_id)
+    query = filter_contacts(query, operator_id, source_id, lead_id)
+    if cursor is not None:
+        query = query.filter(
+            tuple_(created_at_key, Contact.id) > tuple_(*decode_cursor(cursor, (str, int)))
+        )
+    
+    rows = query.order_by(created_at_key, Contact.id).offset(skip).limit(limit).all()
     
-    contacts = query.offset(skip).limit(limit).all()
-    return contacts
+    if expand_names:
+        result = [contact for contact, _ in rows]
+        last_id = rows[-1][0].id if rows else None
+    else:
+        # Заголовки задаются самому ответу: параметр response к нему не применяется.
+        # Ключ курсора (последняя колонка) в ответ не попадает: zip по CONTACT_FIELDS
+        result = response = FastJSONResponse(
+            rows_to_dicts(rows, CONTACT_FIELDS, **dict.fromkeys(CONTACT_EXPANSIONS))
+        )
+        last_id = rows[-1].id if rows else None
+    if rows:
+        set_next_cursor(response, rows, limit, (rows[-1][-1], last_id))
+    return result
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_contacts(
+    export_format: ExportFormat = QueryParam(ExportFormat.NDJSON, alias="format"),
+    operator_id: int = None,
+    source_id: int = None,
+    lead_id: int = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+):
+    """
+    Выгрузить обращения потоком в NDJSON или CSV (по возрастанию created_at, id).
+    
+    Фильтры те же, что у списка обращений, плюс диапазон created_at:
+    created_from включительно, created_to не включительно (время в UTC,
+    если часовой пояс не указан). Строки читаются из курсора БД порциями,
+    память сервера не зависит от объема выгрузки.
+    """
+    created_at_key = type_coerce(Contact.created_at, String)
+    statement = filter_contacts(
+        select(*CONTACT_COLUMNS), operator_id, source_id, lead_id
+    )
+    if created_from is not None:
+        statement = statement.filter(created_at_key >= to_sqlite_timestamp(created_from))
+    if created_to is not None:
+        statement = statement.filter(created_at_key < to_sqlite_timestamp(created_to))
+    statement = statement.order_by(created_at_key, Contact.id)
+    
+    return StreamingResponse(
+        iter_export(ReadSessionLocal, statement, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="contacts.{export_format.value}"'
+        },
+    )
 
 
 @router.get("/{contact_id}", response_model=ContactResponse)
 def get_contact(
     contact_id: int,
-    db: Session = Depends(get_db)
+    expand: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
-    """Получить обращение по ID"""
-    contact = db.query(Contact).filter(Contact.id == contact_id).first()
+    """Получить обращение по ID (expand=lead,source,operator — со связями)"""
+    contact = db.query(Contact).options(
+        *expand_options(Contact, parse_expand(expand, CONTACT_EXPANSIONS))
+    ).filter(Contact.id == contact_id).first()
     if not contact:
         raise HTTPException(status_code=404, detail="Обращение не найдено")
     return contact
 
+
+@router.patch("/{contact_id}", response_model=ContactResponse)
+def update_contact(
+    contact_id: int,
+    contact_update: ContactUpdate,
+    db: Session = Depends(get_db)
+):
+    """
+    Завершить обращение (status=completed) и освободить нагрузку оператора.
+    
+    Повторное завершение ничего не меняет.
+    """
+    if contact_update.status != ContactStatus.COMPLETED:
+        raise HTTPException(status_code=400, detail="Обращение можно только завершить")
+    if db.get(Contact, contact_id) is None:
+        raise HTTPException(status_code=404, detail="Обращение не найдено")
+    
+    complete_contacts(db, contact_ids=[contact_id])
+    return db.get(Contact, contact_id)
@@ -0,0 +1,41 @@
+from typing import Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Load, selectinload
+
+
+def parse_expand(expand: Optional[str], allowed: Sequence[str]) -> list[str]:
+    """
+    Разобрать параметр ?expand= (связи через запятую: expand=lead,operator).
+
+    Args:
+        expand: Значение параметра
+        allowed: Связи, которые эндпоинт умеет раскрывать
+
+    Returns:
+        list[str]: Запрошенные связи без повторов
+
+    Raises:
+        HTTPException: 400 для неизвестной связи
+    """
+    if not expand:
+        return []
+    names = list(dict.fromkeys(name.strip() for name in expand.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Нельзя раскрыть {', '.join(unknown)}; доступно: {', '.join(allowed)}"
+        )
+    return names
+
+
+def expand_options(model, names: Sequence[str]) -> list[Load]:
+    """
+    Опции загрузки раскрываемых связей.
+
+    selectinload загружает связь одним дополнительным запросом на всю страницу
+    (WHERE id IN (...)), поэтому число запросов не зависит от размера страницы
+    и, в отличие от joinedload коллекции, не размножает строки под LIMIT.
+    """
+    return [selectinload(getattr(model, name)) for name in names]
@@ -0,0 +1,78 @@
+import csv
+import enum
+import io
+from datetime import datetime
+from typing import Callable, Iterator
+
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+from app.api.responses import dumps_json
+
+# Сколько строк читать из курсора БД и отдавать клиенту за один раз
+EXPORT_CHUNK_SIZE = 1000
+
+
+class ExportFormat(str, enum.Enum):
+    """Форматы выгрузки обращений"""
+    NDJSON = "ndjson"  # Один JSON-объект на строку
+    CSV = "csv"
+
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+
+def _ndjson_chunk(fields: tuple[str, ...], rows) -> bytes:
+    return b"".join(dumps_json(dict(zip(fields, row))) + b"\n" for row in rows)
+
+
+def _csv_value(value):
+    """Значение ячейки CSV: даты в ISO 8601, как в JSON-ответах"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def iter_export(
+    session_factory: Callable[[], Session],
+    statement: Select,
+    export_format: ExportFormat,
+    chunk_size: int = EXPORT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Потоковая выгрузка результата запроса в NDJSON или CSV.
+
+    Строки читаются из курсора БД порциями по chunk_size (yield_per) и сразу
+    отдаются клиенту, поэтому память не зависит от числа строк. Генератор
+    открывает собственную сессию на время передачи ответа и закрывает ее,
+    в том числе если клиент отключился.
+
+    Args:
+        session_factory: Фабрика сессий (read-only пул)
+        statement: SELECT колонок выгрузки
+        export_format: Формат выгрузки
+        chunk_size: Строк в одной порции
+
+    Yields:
+        bytes: Очередная порция ответа
+    """
+    fields = tuple(column.key for column in statement.selected_columns)
+    if export_format is ExportFormat.CSV:
+        yield _csv_chunk([fields])
+
+    with session_factory() as db:
+        result = db.execute(statement.execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            if export_format is ExportFormat.CSV:
+                yield _csv_chunk(rows)
+            else:
+                yield _ndjson_chunk(fields, rows)
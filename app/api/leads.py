@@ -1,43 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
-from sqlalchemy.orm import joinedload
+from typing import List, Optional
 
-from app.database import get_db
+from app.api.expand import expand_options, parse_expand
+from app.api.pagination import check_pagination, decode_cursor, set_next_cursor
+from app.api.responses import FastJSONResponse, rows_to_dicts
+from app.api.router import CRMRouter
+from app.database import get_read_db
 from app.models.lead import Lead
-from app.schemas.lead import LeadResponse
+from app.schemas.lead import LEAD_EXPANSIONS, LeadResponse
 
-router = APIRouter(prefix="/api/leads", tags=["leads"])
+router = CRMRouter(prefix="/api/leads", tags=["leads"])
+
+# Колонки плоского ответа в порядке полей LeadResponse
+LEAD_COLUMNS = (Lead.external_id, Lead.id)
+LEAD_FIELDS = tuple(column.key for column in LEAD_COLUMNS)
 
 
 @router.get("", response_model=List[LeadResponse])
 def get_leads(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     external_id: str = None,
-    db: Session = Depends(get_db)
+    expand: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
     """
-    Получить список лидов.
+    Получить список лидов (по возрастанию id).
     
-    Поддерживает фильтрацию по external_id.
+    Поддерживает фильтрацию по external_id. Для постраничного обхода
+    используйте cursor из заголовка X-Next-Cursor предыдущей страницы.
+    Обращения лидов включаются в ответ с expand=contacts.
     """
-    query = db.query(Lead)
+    check_pagination(skip, cursor)
+    expand_names = parse_expand(expand, LEAD_EXPANSIONS)
+    if expand_names:
+        query = db.query(Lead).options(*expand_options(Lead, expand_names))
+    else:
+        # Быстрый путь плоского ответа: кортежи колонок без ORM-объектов
+        query = db.query(*LEAD_COLUMNS)
     
     if external_id is not None:
         query = query.filter(Lead.external_id == external_id)
+    if cursor is not None:
+        (last_id,) = decode_cursor(cursor, (int,))
+        query = query.filter(Lead.id > last_id)
     
-    leads = query.options(joinedload(Lead.contacts)).offset(skip).limit(limit).all()
-    return leads
+    rows = query.order_by(Lead.id).offset(skip).limit(limit).all()
+    if expand_names:
+        result = rows
+    else:
+        result = response = FastJSONResponse(
+            rows_to_dicts(rows, LEAD_FIELDS, contacts=[])
+        )
+    if rows:
+        set_next_cursor(response, rows, limit, (rows[-1].id,))
+    return result
 
 
 @router.get("/{lead_id}", response_model=LeadResponse)
 def get_lead(
     lead_id: int,
-    db: Session = Depends(get_db)
+    expand: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
-    """Получить лида по ID с его обращениями"""
-    lead = db.query(Lead).options(joinedload(Lead.contacts)).filter(Lead.id == lead_id).first()
+    """Получить лида по ID (с его обращениями — expand=contacts)"""
+    lead = db.query(Lead).options(
+        *expand_options(Lead, parse_expand(expand, LEAD_EXPANSIONS))
+    ).filter(Lead.id == lead_id).first()
     if not lead:
         raise HTTPException(status_code=404, detail="Лид не найден")
     return lead
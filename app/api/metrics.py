@@ -0,0 +1,69 @@
+import time
+
+from fastapi import Depends, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.api.router import CRMRouter
+from app.database import get_read_db
+from app.metrics import http_request_duration, metrics, operator_active_load, operator_max_load
+from app.models.operator import Operator
+
+# Тип содержимого текстового формата Prometheus
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = CRMRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics(db: Session = Depends(get_read_db)):
+    """Метрики в текстовом формате Prometheus (нагрузка операторов — на момент запроса)"""
+    # Новые значения собираются целиком и подменяются одним шагом, чтобы
+    # параллельный /metrics не отрендерил пустой или наполовину заполненный набор
+    active_loads, max_loads = {}, {}
+    for operator_id, active_load, max_load in db.execute(
+        select(Operator.id, Operator.active_load, Operator.max_load)
+    ):
+        active_loads[(operator_id,)] = active_load
+        max_loads[(operator_id,)] = max_load
+    operator_active_load.replace(active_loads)
+    operator_max_load.replace(max_loads)
+    return Response(content=metrics.render(), media_type=METRICS_MEDIA_TYPE)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: время обработки HTTP-запросов (crm_http_request_duration_seconds).
+
+    Метка route — шаблон пути маршрута (/api/operators/{operator_id}), а не
+    фактический путь, чтобы число рядов не росло с числом ID. Запросы,
+    не совпавшие ни с одним маршрутом, учитываются с route="unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status_code,
+            )
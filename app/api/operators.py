@@ -1,12 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.database import get_db
+from app.api.router import CRMRouter
+from app.database import get_db, get_read_db
 from app.models.operator import Operator
-from app.schemas.operator import OperatorCreate, OperatorUpdate, OperatorResponse
+from app.schemas.operator import (
+    OperatorCreate,
+    OperatorUpdate,
+    OperatorResponse,
+    OperatorUpdateResponse,
+    OperatorLoadReconciliation,
+)
+from app.schemas.contact import ContactReassignmentResult
+from app.services.distribution import reconcile_operator_loads
+from app.services.backlog import backlog_dispatcher
+from app.services.reassignment import reassign_operator_contacts
+from app.services.routing_cache import routing_cache, bump_routing_version
 
-router = APIRouter(prefix="/api/operators", tags=["operators"])
+router = CRMRouter(prefix="/api/operators", tags=["operators"])
 
 
 @router.post("", response_model=OperatorResponse, status_code=201)
@@ -21,8 +33,10 @@ def create_operator(
         max_load=operator.max_load
     )
     db.add(db_operator)
+    bump_routing_version(db)
     db.commit()
     db.refresh(db_operator)
+    routing_cache.refresh(db)
     return db_operator
 
 
@@ -30,17 +44,37 @@ def create_operator(
 def get_operators(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Получить список всех операторов"""
     operators = db.query(Operator).offset(skip).limit(limit).all()
     return operators
 
 
+@router.post("/reconcile-load", response_model=List[OperatorLoadReconciliation])
+def reconcile_load(
+    db: Session = Depends(get_db)
+):
+    """
+    Пересчитать счетчики нагрузки операторов по активным обращениям.
+    
+    Возвращает операторов, у которых счетчик active_load был исправлен.
+    """
+    corrections = reconcile_operator_loads(db)
+    return [
+        OperatorLoadReconciliation(
+            operator_id=operator_id,
+            previous_load=previous_load,
+            actual_load=actual_load
+        )
+        for operator_id, previous_load, actual_load in corrections
+    ]
+
+
 @router.get("/{operator_id}", response_model=OperatorResponse)
 def get_operator(
     operator_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Получить оператора по ID"""
     operator = db.query(Operator).filter(Operator.id == operator_id).first()
@@ -49,13 +83,20 @@ def get_operator(
     return operator
 
 
-@router.patch("/{operator_id}", response_model=OperatorResponse)
+@router.patch("/{operator_id}", response_model=OperatorUpdateResponse)
 def update_operator(
     operator_id: int,
     operator_update: OperatorUpdate,
+    reassign: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Обновить оператора (активность, лимит нагрузки, имя)"""
+    """
+    Обновить оператора (активность, лимит нагрузки, имя).
+    
+    С reassign=true активные обращения деактивированного оператора (и источников,
+    откуда он убран) передаются другим операторам; не поместившиеся по емкости
+    уходят в очередь без оператора. Итог — в поле reassignment ответа.
+    """
     operator = db.query(Operator).filter(Operator.id == operator_id).first()
     if not operator:
         raise HTTPException(status_code=404, detail="Оператор не найден")
@@ -67,7 +108,22 @@ def update_operator(
     if operator_update.max_load is not None:
         operator.max_load = operator_update.max_load
     
+    bump_routing_version(db)
     db.commit()
     db.refresh(operator)
-    return operator
+    routing_cache.refresh(db)
+    
+    response = OperatorUpdateResponse.model_validate(operator)
+    if reassign:
+        result = reassign_operator_contacts(db, operator_id)
+        response.reassignment = ContactReassignmentResult(
+            reassigned=result.reassigned,
+            unassigned=result.unassigned,
+            reassigned_by_operator=result.reassigned_by_operator,
+        )
+        response.active_load = db.query(Operator.active_load) \
+            .filter(Operator.id == operator_id).scalar()
+    # Активация или рост max_load освобождает емкость для очереди без оператора
+    backlog_dispatcher.notify()
+    return response
 
@@ -0,0 +1,72 @@
+import base64
+import binascii
+import json
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, Response
+
+# Заголовок ответа с курсором следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(key: Sequence) -> str:
+    """
+    Упаковать ключ последней строки страницы в непрозрачный курсор.
+
+    Args:
+        key: Значения ключа сортировки (например, (created_at, id))
+
+    Returns:
+        str: Курсор (base64url без выравнивания)
+    """
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> tuple:
+    """
+    Распаковать курсор, полученный от клиента.
+
+    Args:
+        cursor: Курсор из параметра запроса
+        types: Ожидаемые типы значений ключа
+
+    Returns:
+        tuple: Значения ключа сортировки
+
+    Raises:
+        HTTPException: 400, если курсор поврежден или от другого эндпоинта
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        key = None
+    if (
+        not isinstance(key, list)
+        or len(key) != len(types)
+        or not all(type(value) is expected for value, expected in zip(key, types))
+    ):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    return tuple(key)
+
+
+def check_pagination(skip: int, cursor: Optional[str]) -> None:
+    """Курсор задает начало страницы сам, вместе со skip он не используется"""
+    if cursor is not None and skip:
+        raise HTTPException(status_code=400, detail="Параметры cursor и skip несовместимы")
+
+
+def set_next_cursor(response: Response, items: Sequence, limit: int, key: Sequence) -> None:
+    """
+    Передать курсор следующей страницы в заголовке X-Next-Cursor.
+
+    Курсор выдается только для полной страницы: неполная — последняя.
+
+    Args:
+        response: Ответ эндпоинта
+        items: Строки текущей страницы
+        limit: Размер страницы
+        key: Ключ сортировки последней строки
+    """
+    if items and len(items) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key)
@@ -0,0 +1,49 @@
+from typing import Any, Iterable, Sequence
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson не обязателен
+    orjson = None
+
+
+def dumps_json(content: Any) -> bytes:
+    """
+    Сериализовать данные в JSON: orjson, если установлен, иначе сериализатор
+    pydantic-core. Оба работают вне интерпретатора и понимают datetime.
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return pydantic_core.to_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON-ответ для быстрого пути списков (в духе ORJSONResponse).
+
+    Эндпоинт возвращает готовые словари из кортежей колонок и сам отдает
+    этот ответ: валидация ORM-объектов через from_attributes и response_model
+    пропускается. Классом ответа по умолчанию не назначается: для остальных
+    эндпоинтов FastAPI сам сериализует response_model в байты через pydantic-core.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+def rows_to_dicts(rows: Iterable[Sequence], fields: Sequence[str], **constants: Any) -> list[dict]:
+    """
+    Превратить кортежи колонок в словари ответа.
+
+    Args:
+        rows: Строки результата (кортежи в порядке fields)
+        fields: Имена полей ответа
+        constants: Поля с постоянным значением (например, нераскрытые связи:
+            None для объекта, [] для коллекции)
+
+    Returns:
+        list[dict]: Элементы ответа
+    """
+    return [dict(zip(fields, row), **constants) for row in rows]
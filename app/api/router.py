@@ -0,0 +1,87 @@
+import inspect
+from functools import wraps
+from typing import Any, Callable
+
+from fastapi import APIRouter, Depends, Response
+from pydantic import TypeAdapter
+from sqlalchemy.util.concurrency import greenlet_spawn
+
+from app.config import settings
+from app.database import get_db, get_read_db, get_async_db, get_async_read_db
+
+# Синхронная dependency сессии -> асинхронная для режима CRM_DB_ASYNC
+ASYNC_SESSION_DEPENDENCIES = {
+    get_db: get_async_db,
+    get_read_db: get_async_read_db,
+}
+
+
+def make_async_endpoint(endpoint: Callable, response_model: Any = None) -> Callable:
+    """
+    Обернуть синхронный эндпоинт с сессией БД в async def.
+
+    Dependency get_db/get_read_db заменяются асинхронными (aiosqlite), а тело
+    эндпоинта выполняется через greenlet_spawn — так же, как AsyncSession.run_sync:
+    код эндпоинта и сервисов остается общим для обоих режимов, но ожидание
+    SQLite не занимает поток из пула FastAPI. Ответ приводится к response_model
+    внутри того же контекста, чтобы ленивые связи загружались асинхронно.
+
+    Args:
+        endpoint: Синхронная функция эндпоинта
+        response_model: Модель ответа эндпоинта
+
+    Returns:
+        Callable: Асинхронный эндпоинт или исходный, если сессии БД в нем нет
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    signature = inspect.signature(endpoint)
+    session_params = []
+    parameters = []
+    for parameter in signature.parameters.values():
+        dependency = getattr(parameter.default, "dependency", None)
+        if dependency in ASYNC_SESSION_DEPENDENCIES:
+            session_params.append(parameter.name)
+            parameter = parameter.replace(
+                default=Depends(ASYNC_SESSION_DEPENDENCIES[dependency]),
+                annotation=inspect.Parameter.empty,
+            )
+        parameters.append(parameter)
+    if not session_params:
+        return endpoint
+
+    adapter: list[TypeAdapter] = []
+
+    def call(kwargs: dict) -> Any:
+        for name in session_params:
+            kwargs[name] = kwargs[name].sync_session
+        result = endpoint(**kwargs)
+        if response_model is None or isinstance(result, Response):
+            return result
+        if not adapter:
+            # Схемы с forward references готовы только после model_rebuild в app.main
+            adapter.append(TypeAdapter(response_model))
+        return adapter[0].validate_python(result, from_attributes=True)
+
+    @wraps(endpoint)
+    async def async_endpoint(**kwargs):
+        return await greenlet_spawn(call, kwargs)
+
+    async_endpoint.__signature__ = signature.replace(parameters=parameters)
+    return async_endpoint
+
+
+class CRMRouter(APIRouter):
+    """
+    APIRouter, выбирающий режим работы с БД по настройке CRM_DB_ASYNC.
+
+    В синхронном режиме эндпоинты регистрируются как есть (FastAPI выполняет
+    их в пуле потоков). В асинхронном эндпоинты с сессией БД превращаются
+    в async def поверх aiosqlite (см. make_async_endpoint).
+    """
+
+    def add_api_route(self, path: str, endpoint: Callable, **kwargs: Any) -> None:
+        if settings.db_async:
+            endpoint = make_async_endpoint(endpoint, kwargs.get("response_model"))
+        super().add_api_route(path, endpoint, **kwargs)
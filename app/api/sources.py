@@ -1,14 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from fastapi import Depends, HTTPException, Response
+from sqlalchemy.orm import Session, selectinload
 from typing import List
 
-from app.database import get_db
+from app.api.router import CRMRouter
+from app.database import get_db, get_read_db
+from app.models.operator import Operator
 from app.models.source import Source
 from app.models.operator_source_weight import OperatorSourceWeight
-from app.schemas.source import SourceCreate, SourceResponse
-from app.schemas.operator_source_weight import SourceOperatorsConfig, OperatorSourceWeightResponse
+from app.schemas.source import SourceCreate, SourceUpdate, SourceResponse, SourceBacklogResponse
+from app.schemas.contact import ContactReassignmentResult
+from app.schemas.operator_source_weight import (
+    SourceOperatorsConfig,
+    OperatorSourceWeightResponse,
+    RoutingConfig,
+    RoutingConfigResult,
+)
+from app.schemas.simulation import (
+    MAX_SEQUENTIAL_SIMULATION_CONTACTS,
+    SimulationRequest,
+    SimulationResponse,
+)
+from app.services.backlog import backlog_dispatcher, get_backlog_stats
+from app.services.reassignment import reassign_removed_operators
+from app.services.routing_cache import RouteOperator, SourceRoute, routing_cache, bump_routing_version
+from app.services.routing_config import apply_routing_config
+from app.services.simulator import VECTORIZED_STRATEGIES, simulate_distribution
 
-router = APIRouter(prefix="/api/sources", tags=["sources"])
+router = CRMRouter(prefix="/api/sources", tags=["sources"])
+
+# Итог переназначения обращений при настройке весов с ?reassign=true
+REASSIGNED_HEADER = "X-Contacts-Reassigned"
+UNASSIGNED_HEADER = "X-Contacts-Unassigned"
 
 
 @router.post("", response_model=SourceResponse, status_code=201)
@@ -27,11 +50,15 @@ def create_source(
     
     db_source = Source(
         name=source.name,
-        code=source.code
+        code=source.code,
+        strategy=source.strategy.value,
+        contact_ttl_seconds=source.contact_ttl_seconds
     )
     db.add(db_source)
+    bump_routing_version(db)
     db.commit()
     db.refresh(db_source)
+    routing_cache.refresh(db)
     return db_source
 
 
@@ -39,22 +66,120 @@ def create_source(
 def get_sources(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Получить список всех источников"""
-    sources = db.query(Source).offset(skip).limit(limit).all()
+    """Получить список всех источников с весами операторов"""
+    sources = db.query(Source).options(selectinload(Source.operator_weights)) \
+        .offset(skip).limit(limit).all()
     return sources
 
 
+@router.put("/config", response_model=RoutingConfigResult)
+def configure_routing(
+    config: RoutingConfig,
+    reassign: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Настроить операторов с весами сразу для нескольких источников.
+    
+    Для каждого переданного источника список операторов полный, остальные
+    источники не меняются. Применяются только отличия от текущих весов —
+    одной транзакцией, снимок маршрутизации обновляется один раз.
+    С reassign=true активные обращения убранных операторов передаются
+    оставшимся операторам их источников.
+    """
+    try:
+        diff = apply_routing_config(
+            db, {source.source_id: source.as_weights() for source in config.sources}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    routing_cache.refresh(db)
+    
+    reassignment = None
+    if reassign:
+        result = reassign_removed_operators(db, diff.removed_operators)
+        reassignment = ContactReassignmentResult(
+            reassigned=result.reassigned,
+            unassigned=result.unassigned,
+            reassigned_by_operator=result.reassigned_by_operator,
+        )
+    backlog_dispatcher.notify()
+    
+    return RoutingConfigResult(
+        inserted=diff.inserted,
+        updated=diff.updated,
+        deleted=diff.deleted,
+        unchanged=diff.unchanged,
+        reassignment=reassignment,
+    )
+
+
+@router.get("/backlog", response_model=List[SourceBacklogResponse])
+def get_sources_backlog(
+    db: Session = Depends(get_read_db)
+):
+    """
+    Очередь обращений без оператора по источникам.
+    
+    Для каждого источника с непустой очередью — сколько обращений ждут
+    оператора и сколько секунд ждет самое старое из них.
+    """
+    stats = get_backlog_stats(db)
+    codes = dict(
+        db.query(Source.id, Source.code)
+        .filter(Source.id.in_([item.source_id for item in stats]))
+        .all()
+    )
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return [
+        SourceBacklogResponse(
+            source_id=item.source_id,
+            code=codes.get(item.source_id),
+            depth=item.depth,
+            oldest_wait_seconds=max((now - item.oldest_created_at).total_seconds(), 0.0),
+        )
+        for item in stats
+    ]
+
+
 @router.get("/{source_id}", response_model=SourceResponse)
 def get_source(
     source_id: int,
+    db: Session = Depends(get_read_db)
+):
+    """Получить источник по ID с весами операторов"""
+    source = db.query(Source).options(selectinload(Source.operator_weights)) \
+        .filter(Source.id == source_id).first()
+    if not source:
+        raise HTTPException(status_code=404, detail="Источник не найден")
+    return source
+
+
+@router.patch("/{source_id}", response_model=SourceResponse)
+def update_source(
+    source_id: int,
+    source_update: SourceUpdate,
     db: Session = Depends(get_db)
 ):
-    """Получить источник по ID"""
+    """Обновить источник (название, стратегия распределения, TTL обращений)"""
     source = db.query(Source).filter(Source.id == source_id).first()
     if not source:
         raise HTTPException(status_code=404, detail="Источник не найден")
+    
+    if source_update.name is not None:
+        source.name = source_update.name
+    if source_update.strategy is not None:
+        source.strategy = source_update.strategy.value
+    if "contact_ttl_seconds" in source_update.model_fields_set:
+        source.contact_ttl_seconds = source_update.contact_ttl_seconds
+    
+    bump_routing_version(db)
+    db.commit()
+    db.refresh(source)
+    routing_cache.refresh(db)
     return source
 
 
@@ -62,65 +187,121 @@ def get_source(
 def configure_source_operators(
     source_id: int,
     config: SourceOperatorsConfig,
+    response: Response,
+    reassign: bool = False,
     db: Session = Depends(get_db)
 ):
     """
     Настроить операторов для источника с весами.
     
-    Удаляет существующие веса и создает новые согласно переданной конфигурации.
+    Приводит веса источника к переданной конфигурации: операторы вне ее
+    убираются, остальные добавляются или получают новый вес.
+    С reassign=true активные обращения источника у убранных операторов
+    передаются оставшимся (итог — в заголовках X-Contacts-Reassigned
+    и X-Contacts-Unassigned).
     """
     # Проверяем, что источник существует
     source = db.query(Source).filter(Source.id == source_id).first()
     if not source:
         raise HTTPException(status_code=404, detail="Источник не найден")
     
-    # Удаляем существующие веса для этого источника
-    db.query(OperatorSourceWeight).filter(
-        OperatorSourceWeight.source_id == source_id
-    ).delete()
-    
-    # Создаем новые веса
-    created_weights = []
-    for op_weight in config.operator_weights:
-        # Проверяем, что оператор существует
-        from app.models.operator import Operator
-        operator = db.query(Operator).filter(Operator.id == op_weight.operator_id).first()
-        if not operator:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Оператор с ID {op_weight.operator_id} не найден"
-            )
-        
-        weight = OperatorSourceWeight(
-            operator_id=op_weight.operator_id,
-            source_id=source_id,
-            weight=op_weight.weight
-        )
-        db.add(weight)
-        created_weights.append(weight)
+    try:
+        diff = apply_routing_config(db, {source_id: config.as_weights()})
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     
-    db.commit()
+    routing_cache.refresh(db)
     
-    # Обновляем объекты для ответа
-    for weight in created_weights:
-        db.refresh(weight)
+    if reassign:
+        result = reassign_removed_operators(db, diff.removed_operators)
+        response.headers[REASSIGNED_HEADER] = str(result.reassigned)
+        response.headers[UNASSIGNED_HEADER] = str(result.unassigned)
+    backlog_dispatcher.notify()
     
-    return created_weights
+    # Веса для ответа — одним запросом вместе с операторами
+    return db.query(OperatorSourceWeight).options(selectinload(OperatorSourceWeight.operator)) \
+        .filter(OperatorSourceWeight.source_id == source_id).all()
 
 
 @router.get("/{source_id}/operators", response_model=List[OperatorSourceWeightResponse])
 def get_source_operators(
     source_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Получить список операторов с весами для источника"""
     source = db.query(Source).filter(Source.id == source_id).first()
     if not source:
         raise HTTPException(status_code=404, detail="Источник не найден")
     
-    weights = db.query(OperatorSourceWeight).filter(
+    weights = db.query(OperatorSourceWeight).options(
+        selectinload(OperatorSourceWeight.operator)
+    ).filter(
         OperatorSourceWeight.source_id == source_id
     ).all()
     
     return weights
 
+
+
+@router.post("/{source_id}/simulate", response_model=SimulationResponse)
+def simulate_source(
+    source_id: int,
+    request: SimulationRequest,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Смоделировать распределение по предлагаемым весам источника.
+    
+    Ничего не меняет в БД: маршрут строится из переданных весов и текущих
+    max_load/is_active операторов, обращения моделируются по заданной
+    интенсивности и времени обработки (нужен пакет numpy).
+    """
+    source = db.query(Source).filter(Source.id == source_id).first()
+    if not source:
+        raise HTTPException(status_code=404, detail="Источник не найден")
+    
+    weights = request.as_weights()
+    operators = {
+        operator.id: operator
+        for operator in db.query(Operator).filter(Operator.id.in_(list(weights)))
+    }
+    missing = sorted(set(weights) - set(operators))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Оператор с ID {missing[0]} не найден")
+    
+    strategy = request.strategy.value if request.strategy else source.strategy
+    # Стратегии без векторизованного выбора моделируются по одному обращению
+    if (
+        strategy not in VECTORIZED_STRATEGIES
+        and request.expected_contacts > MAX_SEQUENTIAL_SIMULATION_CONTACTS
+    ):
+        raise HTTPException(
+            status_code=422,
+            detail=f"Для стратегии {strategy} ожидается больше "
+                   f"{MAX_SEQUENTIAL_SIMULATION_CONTACTS} обращений за симуляцию"
+        )
+    
+    route = SourceRoute(
+        source_id=source.id,
+        code=source.code,
+        strategy=strategy,
+        operators=tuple(
+            RouteOperator(
+                operator_id, weight, operators[operator_id].max_load, operators[operator_id].is_active
+            )
+            for operator_id, weight in sorted(weights.items())
+        ),
+    )
+    try:
+        return simulate_distribution(
+            route,
+            arrival_rates=request.arrival_rates,
+            mean_handling_time=request.mean_handling_time_seconds,
+            duration=request.duration_seconds,
+            handling_time_sigma=request.handling_time_sigma,
+            rate_interval=request.rate_interval_seconds,
+            tick=request.tick_seconds,
+            seed=request.seed,
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
@@ -0,0 +1,158 @@
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+def _env_str(name: str, default: Optional[str]) -> Optional[str]:
+    """Прочитать строку из переменной окружения (пустая строка — None)"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value or None
+
+
+def _env_float(name: str, default: float) -> float:
+    """Прочитать число с плавающей точкой из переменной окружения"""
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_int(name: str, default: int) -> int:
+    """Прочитать целое число из переменной окружения"""
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_optional_int(name: str, default: Optional[int]) -> Optional[int]:
+    """Прочитать целое число из переменной окружения (пустая строка — None)"""
+    value = _env_str(name, None if default is None else str(default))
+    return int(value) if value is not None else None
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Прочитать флаг из переменной окружения (1/true/yes/on)"""
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Настройки приложения (читаются из переменных окружения CRM_*)"""
+
+    # Строка подключения к БД
+    database_url: str = field(
+        default_factory=lambda: _env_str("CRM_DATABASE_URL", "sqlite:///./crm.db")
+    )
+    # PRAGMA-настройки SQLite, применяются к каждому соединению пула
+    # (None или пустая строка в переменной окружения — не менять значение SQLite)
+    sqlite_journal_mode: Optional[str] = field(
+        default_factory=lambda: _env_str("CRM_SQLITE_JOURNAL_MODE", "WAL")
+    )
+    sqlite_synchronous: Optional[str] = field(
+        default_factory=lambda: _env_str("CRM_SQLITE_SYNCHRONOUS", "NORMAL")
+    )
+    sqlite_busy_timeout_ms: Optional[int] = field(
+        default_factory=lambda: _env_optional_int("CRM_SQLITE_BUSY_TIMEOUT_MS", 5000)
+    )
+    # Отрицательное значение — размер в КиБ (-65536 = 64 МиБ)
+    sqlite_cache_size: Optional[int] = field(
+        default_factory=lambda: _env_optional_int("CRM_SQLITE_CACHE_SIZE", -65536)
+    )
+    sqlite_mmap_size: Optional[int] = field(
+        default_factory=lambda: _env_optional_int("CRM_SQLITE_MMAP_SIZE", 268435456)
+    )
+    sqlite_temp_store: Optional[str] = field(
+        default_factory=lambda: _env_str("CRM_SQLITE_TEMP_STORE", "MEMORY")
+    )
+    # Транзакции пишущего пула начинаются с BEGIN IMMEDIATE: блокировка записи
+    # берется сразу (с ожиданием busy_timeout), а не при первой записи после чтения
+    sqlite_begin_immediate: bool = field(
+        default_factory=lambda: _env_bool("CRM_SQLITE_BEGIN_IMMEDIATE", False)
+    )
+    # Размер пула соединений
+    db_pool_size: int = field(
+        default_factory=lambda: _env_int("CRM_DB_POOL_SIZE", 10)
+    )
+    db_max_overflow: int = field(
+        default_factory=lambda: _env_int("CRM_DB_MAX_OVERFLOW", 20)
+    )
+    db_pool_timeout: float = field(
+        default_factory=lambda: _env_float("CRM_DB_POOL_TIMEOUT", 30.0)
+    )
+    # Асинхронный режим: эндпоинты работают через create_async_engine
+    # с драйвером aiosqlite (нужны пакеты aiosqlite и greenlet)
+    db_async: bool = field(
+        default_factory=lambda: _env_bool("CRM_DB_ASYNC", False)
+    )
+    # Отдельный пул read-only соединений для GET-эндпоинтов
+    db_read_pool_size: int = field(
+        default_factory=lambda: _env_int("CRM_DB_READ_POOL_SIZE", 10)
+    )
+    db_read_max_overflow: int = field(
+        default_factory=lambda: _env_int("CRM_DB_READ_MAX_OVERFLOW", 20)
+    )
+
+    # Как часто (в секундах) сверять версию таблицы маршрутизации с БД
+    routing_check_interval: float = field(
+        default_factory=lambda: _env_float("CRM_ROUTING_CHECK_INTERVAL", 1.0)
+    )
+    # Размер LRU-кэша external_id -> lead_id (0 — кэш отключен)
+    lead_cache_size: int = field(
+        default_factory=lambda: _env_int("CRM_LEAD_CACHE_SIZE", 10000)
+    )
+    # Групповая фиксация обращений: запросы POST /api/contacts объединяются
+    # в пачки одним потоком-писателем (одна транзакция на пачку)
+    contact_writer_enabled: bool = field(
+        default_factory=lambda: _env_bool("CRM_CONTACT_WRITER_ENABLED", False)
+    )
+    # Максимальный размер пачки
+    contact_writer_max_batch: int = field(
+        default_factory=lambda: _env_int("CRM_CONTACT_WRITER_MAX_BATCH", 100)
+    )
+    # Максимальное время ожидания (мс) следующих обращений перед фиксацией пачки
+    contact_writer_max_linger_ms: float = field(
+        default_factory=lambda: _env_float("CRM_CONTACT_WRITER_MAX_LINGER_MS", 5.0)
+    )
+    # Сколько (сек) запрос ждет фиксации своей пачки
+    contact_writer_result_timeout: float = field(
+        default_factory=lambda: _env_float("CRM_CONTACT_WRITER_RESULT_TIMEOUT", 30.0)
+    )
+
+    # Интервал (сек) проверки TTL активных обращений источников (0 — отключено)
+    contact_ttl_sweep_interval: float = field(
+        default_factory=lambda: _env_float("CRM_CONTACT_TTL_SWEEP_INTERVAL", 60.0)
+    )
+    # Сколько обращений завершается одной транзакцией при проверке TTL
+    contact_ttl_sweep_chunk: int = field(
+        default_factory=lambda: _env_int("CRM_CONTACT_TTL_SWEEP_CHUNK", 500)
+    )
+
+    # Интервал (сек) фоновой раздачи обращений без оператора (0 — отключено);
+    # при освобождении емкости раздача запускается сразу
+    backlog_dispatch_interval: float = field(
+        default_factory=lambda: _env_float("CRM_BACKLOG_DISPATCH_INTERVAL", 5.0)
+    )
+    # Сколько обращений очереди распределяется одной транзакцией
+    backlog_dispatch_batch: int = field(
+        default_factory=lambda: _env_int("CRM_BACKLOG_DISPATCH_BATCH", 200)
+    )
+
+    # Метрики в формате Prometheus (GET /metrics): этапы распределения,
+    # время запросов по маршрутам, ожидание соединения из пула
+    metrics_enabled: bool = field(
+        default_factory=lambda: _env_bool("CRM_METRICS_ENABLED", False)
+    )
+    # Учет SQL-запросов: заголовки X-DB-Queries/X-DB-Time в ответах
+    # и журнал медленных запросов
+    db_query_stats_enabled: bool = field(
+        default_factory=lambda: _env_bool("CRM_DB_QUERY_STATS_ENABLED", False)
+    )
+    # Порог (мс) медленного запроса для журнала с параметрами (0 — не журналировать)
+    db_slow_query_ms: float = field(
+        default_factory=lambda: _env_float("CRM_DB_SLOW_QUERY_MS", 100.0)
+    )
+
+
+settings = Settings()
@@ -1,18 +1,224 @@
-from sqlalchemy import create_engine
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Optional
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import URL, Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn
+
+from app.config import Settings, settings
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
 
 # SQLite база данных
-SQLALCHEMY_DATABASE_URL = "sqlite:///./crm.db"
+SQLALCHEMY_DATABASE_URL = settings.database_url
+
+
+def sqlite_pragmas(config: Settings, read_only: bool = False) -> list[tuple[str, object]]:
+    """
+    PRAGMA-настройки SQLite из конфигурации.
+
+    journal_mode=WAL позволяет читателям не блокировать писателя,
+    synchronous=NORMAL в режиме WAL делает fsync только при checkpoint,
+    busy_timeout заставляет ждать блокировку вместо ошибки "database is locked".
+    Read-only соединения не меняют режим журнала и включают query_only.
+
+    Returns:
+        list[tuple[str, object]]: Пары (pragma, значение), None-значения пропущены
+    """
+    if read_only:
+        pragmas = [("query_only", "ON")]
+    else:
+        pragmas = [
+            ("journal_mode", config.sqlite_journal_mode),
+            ("synchronous", config.sqlite_synchronous),
+        ]
+    pragmas += [
+        ("busy_timeout", config.sqlite_busy_timeout_ms),
+        ("cache_size", config.sqlite_cache_size),
+        ("mmap_size", config.sqlite_mmap_size),
+        ("temp_store", config.sqlite_temp_store),
+    ]
+    return [(name, value) for name, value in pragmas if value is not None]
+
+
+def is_sqlite_file_url(url: URL) -> bool:
+    """Указывает ли URL на файловую (не in-memory) БД SQLite"""
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def _engine_options(url: URL, config: Settings, read_only: bool) -> tuple[URL, dict]:
+    """URL и параметры create_engine (пул, connect_args) для sync и async engine"""
+    is_sqlite = url.get_backend_name() == "sqlite"
+
+    engine_kwargs = {}
+    if is_sqlite:
+        engine_kwargs["connect_args"] = {"check_same_thread": False}
+    if read_only and is_sqlite_file_url(url):
+        url = url.set(
+            database=f"file:{url.database}",
+            query={**url.query, "mode": "ro", "uri": "true"},
+        )
+    if not is_sqlite or is_sqlite_file_url(url):
+        # Файловые БД используют QueuePool: задаем его размер
+        engine_kwargs.update(
+            pool_size=config.db_read_pool_size if read_only else config.db_pool_size,
+            max_overflow=config.db_read_max_overflow if read_only else config.db_max_overflow,
+            pool_timeout=config.db_pool_timeout,
+        )
+        if config.metrics_enabled:
+            # Метка пула в метрике ожидания соединения (crm_db_pool_wait_seconds)
+            engine_kwargs["pool_logging_name"] = "read" if read_only else "write"
+    return url, engine_kwargs
+
+
+def _install_sqlite_pragmas(db_engine: Engine, config: Settings, read_only: bool) -> None:
+    """
+    Применять PRAGMA-профиль к каждому новому соединению пула.
+
+    С sqlite_begin_immediate (только пишущий пул) драйвер перестает сам
+    открывать транзакции, и каждая транзакция начинается с BEGIN IMMEDIATE.
+    Транзакция "прочитать емкость — зарезервировать" тогда получает блокировку
+    записи до чтения: в режиме WAL отложенная транзакция, чей снимок устарел
+    к моменту записи, сразу получает "database is locked" без ожидания busy_timeout.
+    """
+    pragmas = sqlite_pragmas(config, read_only=read_only)
+    begin_immediate = config.sqlite_begin_immediate and not read_only
+
+    @event.listens_for(db_engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+        if begin_immediate:
+            dbapi_connection.isolation_level = None
+
+    if begin_immediate:
+        @event.listens_for(db_engine, "begin")
+        def _begin_immediate(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def create_db_engine(
+    database_url: Optional[str] = None,
+    config: Settings = settings,
+    read_only: bool = False
+) -> Engine:
+    """
+    Создать engine с настройками пула и PRAGMA-профилем SQLite.
+
+    PRAGMA применяются обработчиком события connect к каждому новому
+    соединению пула (большинство PRAGMA SQLite действуют на соединение).
+
+    Args:
+        database_url: Строка подключения (по умолчанию — из настроек)
+        config: Настройки (профиль SQLite, размер пула)
+        read_only: Пул только для чтения: файл SQLite открывается как
+            URI с mode=ro, на соединениях включается PRAGMA query_only
+
+    Returns:
+        Engine: Настроенный engine
+    """
+    url, engine_kwargs = _engine_options(
+        make_url(database_url or config.database_url), config, read_only
+    )
+    if "pool_logging_name" in engine_kwargs:
+        from app.metrics import TimedQueuePool
+        engine_kwargs["poolclass"] = TimedQueuePool
+    db_engine = create_engine(url, **engine_kwargs)
+
+    if url.get_backend_name() == "sqlite":
+        _install_sqlite_pragmas(db_engine, config, read_only)
+
+    return db_engine
+
+
+def create_async_db_engine(
+    database_url: Optional[str] = None,
+    config: Settings = settings,
+    read_only: bool = False
+) -> "AsyncEngine":
+    """
+    Создать асинхронный engine (SQLite — через драйвер aiosqlite).
+
+    Пул, read-only режим и PRAGMA-профиль те же, что у create_db_engine:
+    обработчик connect вешается на sync_engine асинхронного engine.
+    Требует пакетов aiosqlite и greenlet, поэтому импорт отложенный.
+
+    Args:
+        database_url: Строка подключения (по умолчанию — из настроек)
+        config: Настройки (профиль SQLite, размер пула)
+        read_only: Пул только для чтения
+
+    Returns:
+        AsyncEngine: Настроенный асинхронный engine
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = make_url(database_url or config.database_url)
+    if url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    url, engine_kwargs = _engine_options(url, config, read_only)
+    if "pool_logging_name" in engine_kwargs:
+        from app.metrics import TimedAsyncAdaptedQueuePool
+        engine_kwargs["poolclass"] = TimedAsyncAdaptedQueuePool
+    db_engine = create_async_engine(url, **engine_kwargs)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+    if url.get_backend_name() == "sqlite":
+        _install_sqlite_pragmas(db_engine.sync_engine, config, read_only)
+
+    return db_engine
+
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Отдельный пул read-only соединений для GET-эндпоинтов: чтение не занимает
+# соединения пула записи. In-memory БД нельзя открыть повторно — для нее
+# используется общий engine.
+if is_sqlite_file_url(make_url(SQLALCHEMY_DATABASE_URL)):
+    read_engine = create_db_engine(SQLALCHEMY_DATABASE_URL, read_only=True)
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Асинхронный режим (CRM_DB_ASYNC): engine и фабрики сессий создаются,
+# только если он включен — aiosqlite не обязателен для синхронного режима
+async_engine = None
+async_read_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if settings.db_async:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = create_async_db_engine(SQLALCHEMY_DATABASE_URL)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+    if is_sqlite_file_url(make_url(SQLALCHEMY_DATABASE_URL)):
+        async_read_engine = create_async_db_engine(SQLALCHEMY_DATABASE_URL, read_only=True)
+    else:
+        async_read_engine = async_engine
+    AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False)
+
 Base = declarative_base()
 
 
+def to_sqlite_timestamp(value: datetime) -> str:
+    """
+    Момент времени в формате, в котором SQLite хранит CURRENT_TIMESTAMP.
+
+    Колонки с server_default=func.now() хранят строки UTC "YYYY-MM-DD HH:MM:SS";
+    сравнение с ними строкой того же формата корректно и использует индексы.
+    Значения с часовым поясом переводятся в UTC, без пояса считаются UTC.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(sep=" ")
+
+
 def get_db():
     """Dependency для получения сессии БД"""
     db = SessionLocal()
@@ -22,6 +228,65 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """Dependency для получения read-only сессии БД (GET-эндпоинты)"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """Dependency для получения асинхронной сессии БД (режим CRM_DB_ASYNC)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """Dependency для получения асинхронной read-only сессии БД (режим CRM_DB_ASYNC)"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+def upgrade_schema(db_engine: Engine) -> set[tuple[str, str]]:
+    """
+    Довести схему существующей БД до моделей без потери данных.
+
+    create_all создает только недостающие таблицы (вместе с их индексами):
+    в уже существующие таблицы недостающие колонки добавляются через
+    ALTER TABLE ... ADD COLUMN (с server_default модели), недостающие
+    индексы создаются отдельно.
+
+    Args:
+        db_engine: Engine БД
+
+    Returns:
+        set[tuple[str, str]]: Добавленные колонки (таблица, колонка)
+    """
+    Base.metadata.create_all(bind=db_engine)
+
+    added = set()
+    with db_engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                    connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                    added.add((table.name, column.name))
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+    return added
+
+
 def init_db():
-    """Создание всех таблиц"""
-    Base.metadata.create_all(bind=engine)
+    """Создание всех таблиц и добавление недостающих колонок в существующие"""
+    added = upgrade_schema(engine)
+    if ("operators", "active_load") in added:
+        # Счетчик нагрузки появился в существующей БД: заполняем по обращениям
+        from app.services.distribution import reconcile_operator_loads
+
+        with SessionLocal() as db:
+            reconcile_operator_loads(db)
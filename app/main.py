@@ -1,28 +1,39 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.database import init_db
+from app.database import init_db, SessionLocal, async_engine, async_read_engine
 from app.api import operators, sources, contacts, leads
+from app.api.metrics import MetricsMiddleware, router as metrics_router
+from app.config import settings
+from app.query_stats import QueryStatsMiddleware, install_query_stats
+from app.services.routing_cache import routing_cache
+from app.services.backlog import backlog_dispatcher
+from app.services.ttl_sweeper import contact_ttl_sweeper
+from app.services.write_coalescer import contact_write_coalescer
 
 # Разрешаем forward references в Pydantic схемах ДО создания FastAPI app
 # Это необходимо для корректной генерации OpenAPI схемы
 # Импортируем все схемы, которые используются в forward references
 from app.schemas.operator import OperatorResponse
-from app.schemas.contact import ContactResponse
-from app.schemas.lead import LeadResponse
-from app.schemas.source import SourceResponse
-from app.schemas.operator_source_weight import OperatorSourceWeightResponse
+from app.schemas.contact import ContactFlatResponse, ContactResponse
+from app.schemas.lead import LeadFlatResponse, LeadResponse
+from app.schemas.source import SourceFlatResponse, SourceResponse
+from app.schemas.operator_source_weight import (
+    OperatorSourceWeightFlatResponse,
+    OperatorSourceWeightResponse,
+)
 
 # Создаем локальное пространство имен для разрешения forward references
 _localns = {
     "OperatorResponse": OperatorResponse,
-    "ContactResponse": ContactResponse,
-    "LeadResponse": LeadResponse,
-    "SourceResponse": SourceResponse,
-    "OperatorSourceWeightResponse": OperatorSourceWeightResponse,
+    "ContactFlatResponse": ContactFlatResponse,
+    "LeadFlatResponse": LeadFlatResponse,
+    "SourceFlatResponse": SourceFlatResponse,
+    "OperatorSourceWeightFlatResponse": OperatorSourceWeightFlatResponse,
 }
 
 # Вызываем model_rebuild для всех схем с forward references
 # Передаем локальное пространство имен для разрешения циклических зависимостей
+# (вложенные объекты ответов — плоские схемы, поэтому сами ответы не рекурсивны)
 OperatorSourceWeightResponse.model_rebuild(_types_namespace=_localns)
 SourceResponse.model_rebuild(_types_namespace=_localns)
 ContactResponse.model_rebuild(_types_namespace=_localns)
@@ -33,8 +44,24 @@ LeadResponse.model_rebuild(_types_namespace=_localns)
 async def lifespan(app: FastAPI):
      # Startup: инициализация БД при старте
     init_db()
+    # Строим снимок маршрутизации (источники, веса, операторы) для горячего пути
+    with SessionLocal() as db:
+        routing_cache.refresh(db)
+    # Групповая фиксация обращений (опционально)
+    if settings.contact_writer_enabled:
+        contact_write_coalescer.start()
+    # Автоматическое завершение обращений по TTL источников
+    contact_ttl_sweeper.start()
+    # Раздача обращений, созданных без свободного оператора
+    backlog_dispatcher.start()
     yield
-    # Shutdown: можно добавить логику закрытия соединений при необходимости
+    backlog_dispatcher.stop()
+    contact_ttl_sweeper.stop()
+    # Shutdown: фиксируем обращения, оставшиеся в очереди
+    contact_write_coalescer.stop()
+    # Закрываем соединения асинхронных пулов (режим CRM_DB_ASYNC)
+    for db_engine in {async_engine, async_read_engine} - {None}:
+        await db_engine.dispose()
 
 
 app = FastAPI(title="Мини-CRM распределения лидов между операторами и источниками", lifespan=lifespan)
@@ -45,6 +72,16 @@ app.include_router(sources.router)
 app.include_router(contacts.router)
 app.include_router(leads.router)
 
+# Метрики Prometheus (опционально): GET /metrics и время запросов по маршрутам
+if settings.metrics_enabled:
+    app.include_router(metrics_router)
+    app.add_middleware(MetricsMiddleware)
+
+# Учет SQL-запросов (опционально): число и время запросов в заголовках ответа
+if settings.db_query_stats_enabled:
+    install_query_stats()
+    app.add_middleware(QueryStatsMiddleware)
+
 
 @app.get("/")
 async def root():
@@ -0,0 +1,279 @@
+"""
+Встроенный реестр метрик в текстовом формате Prometheus.
+
+Метрики собираются, только если включены (CRM_METRICS_ENABLED): иначе
+инструментированный код вызывает пустые методы (NULL_STAGE_TIMER) или
+проверяет один флаг, а middleware и пул с замером ожидания не подключаются.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import settings
+
+# Границы корзин гистограмм (сек): от долей миллисекунды до секунд
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[object], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """Метрика с набором меток; значения хранятся по кортежу значений меток"""
+
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels[name] for name in self.label_names)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} {self.type_name}"
+        with self._lock:
+            items = sorted(self._values.items(), key=lambda item: tuple(map(str, item[0])))
+            yield from self._render_samples(items)
+
+    def _render_samples(self, items) -> Iterable[str]:
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик"""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Текущее значение"""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def replace(self, values: dict[tuple, float]) -> None:
+        """
+        Заменить все значения разом (рендер видит либо старый набор, либо новый).
+
+        Args:
+            values: Значения по кортежу значений меток (в порядке label_names)
+        """
+        with self._lock:
+            self._values = values
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам (в формате Prometheus — накопительно)"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [счетчики корзин (последняя — +Inf), сумма, количество]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_samples(self, items) -> Iterable[str]:
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), bucket_counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else _format_value(bound)
+                labels = _format_labels(self.label_names, key, f'le="{le}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    """Набор метрик приложения"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._metrics: dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry(enabled=settings.metrics_enabled)
+
+http_request_duration = metrics.histogram(
+    "crm_http_request_duration_seconds",
+    "Время обработки HTTP-запроса по маршруту",
+    ("method", "route", "status"),
+)
+distribute_stage_duration = metrics.histogram(
+    "crm_distribute_stage_seconds",
+    "Время этапов distribute_contact",
+    ("stage",),
+)
+contacts_assigned = metrics.counter(
+    "crm_contacts_assigned_total",
+    "Обращения, получившие оператора при создании",
+    ("source", "operator"),
+)
+contacts_unassigned = metrics.counter(
+    "crm_contacts_unassigned_total",
+    "Обращения, созданные без оператора (нет свободной емкости)",
+    ("source",),
+)
+operator_active_load = metrics.gauge(
+    "crm_operator_active_load",
+    "Текущая нагрузка оператора (активные обращения)",
+    ("operator",),
+)
+operator_max_load = metrics.gauge(
+    "crm_operator_max_load",
+    "Лимит нагрузки оператора",
+    ("operator",),
+)
+db_pool_wait = metrics.histogram(
+    "crm_db_pool_wait_seconds",
+    "Ожидание соединения из пула БД",
+    ("pool",),
+)
+
+
+class StageTimer:
+    """Замер последовательных этапов: mark(stage) — время с предыдущей отметки"""
+
+    __slots__ = ("histogram", "_last")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.histogram.observe(now - self._last, stage=stage)
+        self._last = now
+
+
+class _NullStageTimer:
+    """Замер этапов при выключенных метриках"""
+
+    __slots__ = ()
+
+    def mark(self, stage: str) -> None:
+        pass
+
+
+NULL_STAGE_TIMER = _NullStageTimer()
+
+
+def stage_timer(histogram: Histogram = distribute_stage_duration):
+    """Таймер этапов или пустой таймер, если метрики выключены"""
+    return StageTimer(histogram) if metrics.enabled else NULL_STAGE_TIMER
+
+
+def record_contact_assignment(source: str, operator_id: Optional[int], amount: int = 1) -> None:
+    """Учесть созданные обращения источника (operator_id=None — без оператора)"""
+    if not metrics.enabled:
+        return
+    if operator_id is None:
+        contacts_unassigned.inc(amount, source=source)
+    else:
+        contacts_assigned.inc(amount, source=source, operator=operator_id)
+
+
+class _PoolWaitMixin:
+    """
+    Пул, замеряющий ожидание соединения (_do_get: свободное соединение,
+    новое в пределах overflow или ожидание до pool_timeout).
+    Метка pool — pool_logging_name engine (сохраняется при recreate).
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_wait.observe(
+                time.perf_counter() - started, pool=self._orig_logging_name or "default"
+            )
+
+
+class TimedQueuePool(_PoolWaitMixin, QueuePool):
+    """QueuePool с замером ожидания соединения"""
+
+
+class TimedAsyncAdaptedQueuePool(_PoolWaitMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool с замером ожидания соединения"""
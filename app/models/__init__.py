@@ -1,16 +1,19 @@
 # Импорты моделей для удобства использования
 from app.models.operator import Operator
 from app.models.lead import Lead
-from app.models.source import Source
+from app.models.source import Source, DistributionStrategy
 from app.models.contact import Contact, ContactStatus
 from app.models.operator_source_weight import OperatorSourceWeight
+from app.models.routing_version import RoutingVersion
 
 __all__ = [
     "Operator",
     "Lead",
     "Source",
+    "DistributionStrategy",
     "Contact",
     "ContactStatus",
     "OperatorSourceWeight",
+    "RoutingVersion",
 ]
 
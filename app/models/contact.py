@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -22,6 +22,25 @@ class Contact(Base):
     status = Column(String, default=ContactStatus.ACTIVE.value, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
+    # Составной индекс для подсчета нагрузки оператора (активные контакты).
+    # Индексы по created_at — для курсорной пагинации по (created_at, id)
+    # с фильтрами списка обращений: id (rowid) входит в каждый индекс SQLite неявно
+    __table_args__ = (
+        Index("ix_contacts_operator_status", "operator_id", "status"),
+        # Поиск просроченных активных обращений (TTL источников)
+        Index("ix_contacts_status_created", "status", "created_at"),
+        # Очередь обращений без оператора (частичный индекс: только operator_id IS NULL)
+        Index(
+            "ix_contacts_unassigned",
+            "source_id", "status", "created_at",
+            sqlite_where=text("operator_id IS NULL"),
+        ),
+        Index("ix_contacts_created_at", "created_at"),
+        Index("ix_contacts_operator_created", "operator_id", "created_at"),
+        Index("ix_contacts_source_created", "source_id", "created_at"),
+        Index("ix_contacts_lead_created", "lead_id", "created_at"),
+    )
+
     # Связи с lead, source, operator
     lead = relationship("Lead", back_populates="contacts")
     source = relationship("Source", back_populates="contacts")
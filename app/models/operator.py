@@ -10,6 +10,8 @@ class Operator(Base):
     name = Column(String, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
     max_load = Column(Integer, nullable=False, default=10)  # Лимит активных контактов
+    # Денормализованный счетчик активных контактов (поддерживается в транзакциях распределения)
+    active_load = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Связи с contacts, source_weights
     contacts = relationship("Contact", back_populates="operator")
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer
+from app.database import Base
+
+
+class RoutingVersion(Base):
+    """Версия конфигурации маршрутизации (источники, веса, флаги операторов)"""
+    __tablename__ = "routing_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    # Единственная строка (id = 1); version увеличивается при каждом изменении конфигурации
@@ -1,8 +1,16 @@
 from sqlalchemy import Column, Integer, String, UniqueConstraint
 from sqlalchemy.orm import relationship
+import enum
 from app.database import Base
 
 
+class DistributionStrategy(enum.Enum):
+    """Стратегии распределения обращений источника между операторами"""
+    WEIGHTED_RANDOM = "weighted_random"  # Случайный выбор по весам
+    SMOOTH_ROUND_ROBIN = "smooth_round_robin"  # Плавный взвешенный round-robin (как в nginx)
+    HEADROOM = "headroom"  # Вес масштабируется свободной емкостью оператора
+
+
 class Source(Base):
     __tablename__ = "sources"
 
@@ -10,6 +18,15 @@ class Source(Base):
     name = Column(String, nullable=False)
     code = Column(String, unique=True, nullable=False, index=True)
     # code - уникальный код источника (например, "bot_telegram", "bot_whatsapp")
+    strategy = Column(
+        String,
+        nullable=False,
+        default=DistributionStrategy.WEIGHTED_RANDOM.value,
+        server_default=DistributionStrategy.WEIGHTED_RANDOM.value,
+    )
+    # Через сколько секунд после создания активное обращение завершается
+    # автоматически (None — не завершается)
+    contact_ttl_seconds = Column(Integer, nullable=True)
 
     # Связи с contacts, operator_weights
     contacts = relationship("Contact", back_populates="source")
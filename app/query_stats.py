@@ -0,0 +1,204 @@
+"""
+Учет SQL-запросов: число и время запросов на HTTP-запрос, журнал медленных запросов.
+
+Обработчики before/after_cursor_execute вешаются на engine приложения
+(install_query_stats) только при CRM_DB_QUERY_STATS_ENABLED или при
+использовании тестового помощника assert_max_queries.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import database
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Заголовки ответа с итогом по запросу
+QUERIES_HEADER = "X-DB-Queries"
+TIME_HEADER = "X-DB-Time"
+# Параметры медленного запроса в журнале обрезаются до этой длины
+SLOW_QUERY_PARAMS_MAX_CHARS = 1000
+
+
+class QueryStats:
+    """Число и суммарное время (сек) SQL-запросов"""
+
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+class QueryLog(QueryStats):
+    """QueryStats с текстами выполненных запросов (для тестового помощника)"""
+
+    __slots__ = ("statements",)
+
+    def __init__(self):
+        super().__init__()
+        self.statements: list[str] = []
+
+
+# Счетчик текущего HTTP-запроса. Копия контекста передается в пул потоков
+# FastAPI и в greenlet асинхронного режима, поэтому запросы эндпоинта
+# и его dependency попадают в счетчик. Запросы фоновых потоков (групповая
+# фиксация, TTL, очередь без оператора) не учитываются.
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+# Активные assert_max_queries/capture_queries: учитывают запросы всех потоков
+_captures: list[QueryLog] = []
+_captures_lock = threading.Lock()
+
+
+# Время начала хранится в контексте выполнения запроса, а не в соединении:
+# если запрос упал, after_cursor_execute не вызывается, и время начала
+# осталось бы на соединении, которое пул отдает следующим запросам
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+
+    if _captures:
+        with _captures_lock:
+            for capture in _captures:
+                capture.count += 1
+                capture.duration += elapsed
+                capture.statements.append(statement)
+
+    if settings.db_slow_query_ms and elapsed * 1000 >= settings.db_slow_query_ms:
+        logger.warning(
+            "Медленный SQL-запрос (%.1f мс): %s; параметры: %.*s",
+            elapsed * 1000, statement, SLOW_QUERY_PARAMS_MAX_CHARS, repr(parameters),
+        )
+
+
+def app_engines() -> set[Engine]:
+    """Синхронные engine приложения (для асинхронных — их sync_engine)"""
+    engines = {database.engine, database.read_engine}
+    engines |= {
+        async_engine.sync_engine
+        for async_engine in (database.async_engine, database.async_read_engine)
+        if async_engine is not None
+    }
+    return engines
+
+
+def install_query_stats(engines: Optional[Iterable[Engine]] = None) -> None:
+    """
+    Повесить обработчики учета запросов на engine (повторный вызов ничего не делает).
+
+    Args:
+        engines: Engine для учета (по умолчанию — все engine приложения)
+    """
+    for db_engine in app_engines() if engines is None else engines:
+        if not event.contains(db_engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(db_engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(db_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware: число и время SQL-запросов HTTP-запроса в заголовках ответа.
+
+    X-DB-Queries — число запросов, X-DB-Time — их суммарное время в мс.
+    Учитываются запросы до начала ответа: для потоковых ответов (выгрузка)
+    запросы, выполненные во время передачи тела, в заголовки не попадают.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (QUERIES_HEADER.lower().encode(), str(stats.count).encode()),
+                    (TIME_HEADER.lower().encode(), f"{stats.duration * 1000:.3f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _request_stats.reset(token)
+
+
+@contextmanager
+def capture_queries(engines: Optional[Iterable[Engine]] = None) -> Iterator[QueryLog]:
+    """
+    Собрать SQL-запросы, выполненные внутри блока (в любых потоках).
+
+    Запросы TestClient выполняются в другом потоке, чем тест, поэтому
+    учитываются все запросы engine, а не только текущего контекста.
+
+    Args:
+        engines: Engine для учета (по умолчанию — все engine приложения)
+
+    Yields:
+        QueryLog: Число, время и тексты запросов (заполняется по ходу блока)
+    """
+    install_query_stats(engines)
+    capture = QueryLog()
+    with _captures_lock:
+        _captures.append(capture)
+    try:
+        yield capture
+    finally:
+        with _captures_lock:
+            _captures.remove(capture)
+
+
+@contextmanager
+def assert_max_queries(
+    max_queries: int,
+    engines: Optional[Iterable[Engine]] = None
+) -> Iterator[QueryLog]:
+    """
+    Тестовый помощник: блок должен выполнить не больше max_queries SQL-запросов.
+
+    Пример:
+        with assert_max_queries(4):
+            client.get("/api/contacts?expand=lead,source,operator")
+
+    Args:
+        max_queries: Допустимое число запросов
+        engines: Engine для учета (по умолчанию — все engine приложения)
+
+    Yields:
+        QueryLog: Собранные запросы
+
+    Raises:
+        AssertionError: Запросов больше max_queries (в сообщении — их тексты)
+    """
+    with capture_queries(engines) as capture:
+        yield capture
+    if capture.count > max_queries:
+        statements = "\n".join(
+            f"{number}. {statement}" for number, statement in enumerate(capture.statements, 1)
+        )
+        raise AssertionError(
+            f"Выполнено {capture.count} SQL-запросов, допустимо {max_queries}:\n{statements}"
+        )
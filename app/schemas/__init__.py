@@ -1,25 +1,70 @@
-from app.schemas.operator import OperatorCreate, OperatorUpdate, OperatorResponse
-from app.schemas.lead import LeadCreate, LeadResponse
-from app.schemas.source import SourceCreate, SourceResponse
-from app.schemas.contact import ContactCreate, ContactResponse
+from app.schemas.operator import (
+    OperatorCreate,
+    OperatorUpdate,
+    OperatorResponse,
+    OperatorUpdateResponse,
+    OperatorLoadReconciliation,
+)
+from app.schemas.lead import LeadCreate, LeadFlatResponse, LeadResponse
+from app.schemas.source import SourceCreate, SourceUpdate, SourceFlatResponse, SourceResponse, SourceBacklogResponse
+from app.schemas.contact import (
+    ContactCreate,
+    ContactFlatResponse,
+    ContactResponse,
+    ContactBatchCreate,
+    ContactBatchItemResult,
+    ContactUpdate,
+    ContactCompleteRequest,
+    ContactCompleteResult,
+    ContactReassignmentResult,
+)
 from app.schemas.operator_source_weight import (
     OperatorSourceWeightCreate,
+    OperatorSourceWeightFlatResponse,
     OperatorSourceWeightResponse,
     SourceOperatorsConfig,
+    SourceWeightsConfig,
+    RoutingConfig,
+    RoutingConfigResult,
+)
+from app.schemas.simulation import (
+    SimulationRequest,
+    OperatorSimulationStatsResponse,
+    SimulationResponse,
 )
 
 __all__ = [
     "OperatorCreate",
     "OperatorUpdate",
     "OperatorResponse",
+    "OperatorUpdateResponse",
+    "OperatorLoadReconciliation",
     "LeadCreate",
+    "LeadFlatResponse",
     "LeadResponse",
     "SourceCreate",
+    "SourceUpdate",
+    "SourceFlatResponse",
     "SourceResponse",
+    "SourceBacklogResponse",
     "ContactCreate",
+    "ContactFlatResponse",
     "ContactResponse",
+    "ContactBatchCreate",
+    "ContactBatchItemResult",
+    "ContactUpdate",
+    "ContactCompleteRequest",
+    "ContactCompleteResult",
+    "ContactReassignmentResult",
     "OperatorSourceWeightCreate",
+    "OperatorSourceWeightFlatResponse",
     "OperatorSourceWeightResponse",
     "SourceOperatorsConfig",
+    "SourceWeightsConfig",
+    "RoutingConfig",
+    "RoutingConfigResult",
+    "SimulationRequest",
+    "OperatorSimulationStatsResponse",
+    "SimulationResponse",
 ]
 
@@ -0,0 +1,30 @@
+from typing import Any
+
+from pydantic import BaseModel, model_validator
+from sqlalchemy import inspect
+from sqlalchemy.orm import InstanceState
+
+
+class LoadedRelationsResponse(BaseModel):
+    """
+    Схема ответа из ORM-объекта, сериализующая только загруженные связи.
+
+    Связи, не загруженные запросом (например, через selectinload по ?expand=),
+    не вызывают ленивую загрузку на каждый объект списка: поле получает
+    значение по умолчанию схемы (null для объекта, [] для коллекции).
+    """
+
+    @model_validator(mode="before")
+    @classmethod
+    def _skip_unloaded_relationships(cls, data: Any) -> Any:
+        state = inspect(data, raiseerr=False)
+        if not isinstance(state, InstanceState):
+            return data
+        unloaded = state.unloaded.intersection(state.mapper.relationships.keys())
+        if not unloaded:
+            return data
+        return {
+            name: getattr(data, name)
+            for name in cls.model_fields
+            if name not in unloaded and hasattr(data, name)
+        }
@@ -1,14 +1,20 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, Field
-from typing import Optional, TYPE_CHECKING
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List, Optional, TYPE_CHECKING
 from datetime import datetime
 
+from app.models.contact import ContactStatus
+from app.schemas.base import LoadedRelationsResponse
+
 if TYPE_CHECKING:
-    from app.schemas.lead import LeadResponse
-    from app.schemas.source import SourceResponse
+    from app.schemas.lead import LeadFlatResponse
+    from app.schemas.source import SourceFlatResponse
     from app.schemas.operator import OperatorResponse
 
+# Связи обращения, которые можно запросить параметром ?expand=
+CONTACT_EXPANSIONS = ("lead", "source", "operator")
+
 
 class ContactBase(BaseModel):
     """Базовая схема обращения"""
@@ -22,17 +28,79 @@ class ContactCreate(BaseModel):
     message: Optional[str] = Field(None, description="Текст обращения (опционально)")
 
 
-class ContactResponse(ContactBase):
-    """Схема ответа с обращением"""
+class ContactBatchCreate(BaseModel):
+    """Схема для пакетной регистрации обращений"""
+    items: List[ContactCreate] = Field(
+        ...,
+        min_length=1,
+        max_length=10000,
+        description="Обращения в порядке поступления"
+    )
+
+
+class ContactBatchItemResult(BaseModel):
+    """Результат обработки одного элемента пачки"""
+    contact_id: Optional[int] = Field(None, description="ID созданного обращения")
+    operator_id: Optional[int] = Field(None, description="ID назначенного оператора")
+    error: Optional[str] = Field(None, description="Ошибка, если обращение не создано")
+
+
+class ContactUpdate(BaseModel):
+    """Схема для изменения обращения"""
+    status: ContactStatus = Field(..., description="Новый статус (поддерживается completed)")
+
+
+class ContactCompleteRequest(BaseModel):
+    """Условия массового завершения обращений (применяются вместе)"""
+    contact_ids: Optional[List[int]] = Field(
+        None, max_length=10000, description="ID обращений"
+    )
+    operator_id: Optional[int] = Field(None, description="Все активные обращения оператора")
+    older_than: Optional[datetime] = Field(
+        None, description="Обращения, созданные раньше этого момента (UTC, если пояс не указан)"
+    )
+
+    @model_validator(mode="after")
+    def _require_condition(self):
+        if self.contact_ids is None and self.operator_id is None and self.older_than is None:
+            raise ValueError("Укажите contact_ids, operator_id или older_than")
+        return self
+
+
+class ContactCompleteResult(BaseModel):
+    """Результат массового завершения обращений"""
+    completed: int = Field(..., description="Сколько обращений завершено")
+    released_by_operator: Dict[int, int] = Field(
+        default_factory=dict, description="Освобожденная нагрузка по ID оператора"
+    )
+
+
+class ContactReassignmentResult(BaseModel):
+    """Результат переназначения активных обращений оператора"""
+    reassigned: int = Field(..., description="Сколько обращений передано другим операторам")
+    unassigned: int = Field(..., description="Сколько обращений ушло в очередь без оператора")
+    reassigned_by_operator: Dict[int, int] = Field(
+        default_factory=dict, description="Сколько обращений получил каждый оператор"
+    )
+
+
+class ContactFlatResponse(ContactBase):
+    """Схема обращения без вложенных объектов (только ID связей)"""
     id: int
     lead_id: int
     source_id: int
     operator_id: Optional[int] = None
     created_at: datetime
-    
-    # Вложенные объекты (опционально, для детального ответа)
-    lead: Optional["LeadResponse"] = None
-    source: Optional["SourceResponse"] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ContactResponse(ContactFlatResponse, LoadedRelationsResponse):
+    """Схема ответа с обращением"""
+    # Вложенные объекты (только запрошенные через ?expand=, без дальнейшей вложенности)
+    lead: Optional["LeadFlatResponse"] = None
+    source: Optional["SourceFlatResponse"] = None
     operator: Optional["OperatorResponse"] = None
 
     class Config:
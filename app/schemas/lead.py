@@ -1,10 +1,15 @@
 from __future__ import annotations
 
 from pydantic import BaseModel, Field
-from typing import List, Optional, TYPE_CHECKING
+from typing import List, TYPE_CHECKING
+
+from app.schemas.base import LoadedRelationsResponse
 
 if TYPE_CHECKING:
-    from app.schemas.contact import ContactResponse
+    from app.schemas.contact import ContactFlatResponse
+
+# Связи лида, которые можно запросить параметром ?expand=
+LEAD_EXPANSIONS = ("contacts",)
 
 
 class LeadBase(BaseModel):
@@ -17,10 +22,18 @@ class LeadCreate(LeadBase):
     pass
 
 
-class LeadResponse(LeadBase):
-    """Схема ответа с лидом"""
+class LeadFlatResponse(LeadBase):
+    """Схема лида без вложенных объектов"""
     id: int
-    contacts: Optional[List["ContactResponse"]] = None
+
+    class Config:
+        from_attributes = True
+
+
+class LeadResponse(LeadFlatResponse, LoadedRelationsResponse):
+    """Схема ответа с лидом"""
+    # Обращения лида (только с ?expand=contacts; без expand — пустой список)
+    contacts: List["ContactFlatResponse"] = Field(default_factory=list)
 
     class Config:
         from_attributes = True
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field
 from typing import Optional
 
+from app.schemas.contact import ContactReassignmentResult
+
 
 class OperatorBase(BaseModel):
     """Базовая схема оператора"""
@@ -24,6 +26,20 @@ class OperatorUpdate(BaseModel):
 class OperatorResponse(OperatorBase):
     """Схема ответа с оператором"""
     id: int
+    active_load: int = Field(default=0, description="Текущее количество активных контактов")
 
     class Config:
         from_attributes = True
+
+
+class OperatorUpdateResponse(OperatorResponse):
+    """Схема ответа на обновление оператора"""
+    # Заполняется, если запрошено переназначение обращений (?reassign=true)
+    reassignment: Optional[ContactReassignmentResult] = None
+
+
+class OperatorLoadReconciliation(BaseModel):
+    """Результат пересчета счетчика нагрузки оператора"""
+    operator_id: int
+    previous_load: int = Field(..., description="Значение счетчика до пересчета")
+    actual_load: int = Field(..., description="Фактическое количество активных контактов")
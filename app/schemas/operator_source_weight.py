@@ -1,11 +1,14 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, TYPE_CHECKING
 
+from app.schemas.base import LoadedRelationsResponse
+from app.schemas.contact import ContactReassignmentResult
+
 if TYPE_CHECKING:
     from app.schemas.operator import OperatorResponse
-    from app.schemas.source import SourceResponse
+    from app.schemas.source import SourceFlatResponse
 
 
 class OperatorSourceWeightBase(BaseModel):
@@ -19,12 +22,19 @@ class OperatorSourceWeightCreate(OperatorSourceWeightBase):
     source_id: int = Field(..., description="ID источника")
 
 
-class OperatorSourceWeightResponse(OperatorSourceWeightBase):
-    """Схема ответа с весом"""
+class OperatorSourceWeightFlatResponse(OperatorSourceWeightBase):
+    """Схема веса без вложенных объектов"""
     id: int
     source_id: int
+
+    class Config:
+        from_attributes = True
+
+
+class OperatorSourceWeightResponse(OperatorSourceWeightFlatResponse, LoadedRelationsResponse):
+    """Схема ответа с весом"""
     operator: Optional["OperatorResponse"] = None
-    source: Optional["SourceResponse"] = None
+    source: Optional["SourceFlatResponse"] = None
 
     class Config:
         from_attributes = True
@@ -37,3 +47,46 @@ class SourceOperatorsConfig(BaseModel):
         description="Список операторов с их весами для данного источника"
     )
 
+    @model_validator(mode="after")
+    def check_unique_operators(self) -> "SourceOperatorsConfig":
+        operator_ids = [op_weight.operator_id for op_weight in self.operator_weights]
+        if len(operator_ids) != len(set(operator_ids)):
+            raise ValueError("Оператор указан для источника несколько раз")
+        return self
+
+    def as_weights(self) -> dict[int, int]:
+        """Веса в виде operator_id -> вес"""
+        return {op_weight.operator_id: op_weight.weight for op_weight in self.operator_weights}
+
+
+class SourceWeightsConfig(SourceOperatorsConfig):
+    """Операторы с весами одного источника в общей конфигурации маршрутизации"""
+    source_id: int = Field(..., description="ID источника")
+
+
+class RoutingConfig(BaseModel):
+    """
+    Конфигурация маршрутизации сразу для нескольких источников.
+
+    Для каждого переданного источника список операторов полный;
+    источники, которых нет в конфигурации, не меняются.
+    """
+    sources: list[SourceWeightsConfig] = Field(..., description="Источники с операторами и весами")
+
+    @model_validator(mode="after")
+    def check_unique_sources(self) -> "RoutingConfig":
+        source_ids = [source.source_id for source in self.sources]
+        if len(source_ids) != len(set(source_ids)):
+            raise ValueError("Источник указан в конфигурации несколько раз")
+        return self
+
+
+class RoutingConfigResult(BaseModel):
+    """Итог применения конфигурации маршрутизации"""
+    inserted: int = Field(..., description="Сколько весов добавлено")
+    updated: int = Field(..., description="Сколько весов изменено")
+    deleted: int = Field(..., description="Сколько весов удалено")
+    unchanged: int = Field(..., description="Сколько весов не изменилось")
+    # Заполняется, если запрошено переназначение обращений (?reassign=true)
+    reassignment: Optional[ContactReassignmentResult] = None
+
@@ -0,0 +1,98 @@
+import math
+from pydantic import BaseModel, Field, model_validator
+from typing import Annotated, List, Optional
+
+from app.models.source import DistributionStrategy
+from app.schemas.operator_source_weight import SourceOperatorsConfig
+from app.services.simulator import HANDLING_TIME_CAP_FACTOR
+
+# Ограничения одного запроса (симуляция выполняется в воркере запроса):
+# шагов моделирования, тиков среднего времени обработки, интенсивности
+# и интервалов профиля
+MAX_SIMULATION_TICKS = 200_000
+MAX_HANDLING_TIME_TICKS = 50_000
+MAX_ARRIVAL_RATE = 1000.0
+MAX_RATE_INTERVALS = 10_000
+# Ожидаемое число обращений за всю симуляцию; для стратегий без векторизованного
+# выбора (обращения распределяются по одному через strategy.select) — меньше
+MAX_SIMULATION_CONTACTS = 1_000_000
+MAX_SEQUENTIAL_SIMULATION_CONTACTS = 100_000
+# Шаги моделирования x операторы (время) и ячейки буфера освобождений
+# (горизонт времени обработки в тиках x операторы, память)
+MAX_SIMULATION_OPERATOR_TICKS = 10_000_000
+MAX_RELEASE_BUFFER_CELLS = 5_000_000
+
+
+class SimulationRequest(SourceOperatorsConfig):
+    """Параметры симуляции распределения по предлагаемым весам источника"""
+    strategy: Optional[DistributionStrategy] = Field(
+        default=None,
+        description="Стратегия распределения (по умолчанию — стратегия источника)"
+    )
+    arrival_rates: List[Annotated[float, Field(ge=0, le=MAX_ARRIVAL_RATE)]] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_RATE_INTERVALS,
+        description="Обращений в секунду по интервалам rate_interval_seconds (профиль повторяется)"
+    )
+    rate_interval_seconds: float = Field(default=3600.0, gt=0, description="Длительность интервала профиля")
+    mean_handling_time_seconds: float = Field(..., gt=0, description="Среднее время обработки обращения")
+    handling_time_sigma: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Sigma логнормального времени обработки (null — экспоненциальное)"
+    )
+    duration_seconds: float = Field(default=86400.0, gt=0, description="Длительность моделирования")
+    tick_seconds: float = Field(default=1.0, gt=0, description="Шаг моделирования")
+    seed: Optional[int] = Field(default=None, description="Seed генератора случайных чисел")
+
+    @model_validator(mode="after")
+    def check_limits(self) -> "SimulationRequest":
+        ticks = math.ceil(self.duration_seconds / self.tick_seconds)
+        operators = len(self.operator_weights)
+        if ticks > MAX_SIMULATION_TICKS:
+            raise ValueError(f"Не больше {MAX_SIMULATION_TICKS} шагов моделирования")
+        if ticks * operators > MAX_SIMULATION_OPERATOR_TICKS:
+            raise ValueError(
+                f"Шагов моделирования x операторов не больше {MAX_SIMULATION_OPERATOR_TICKS}: "
+                "увеличьте tick_seconds или сократите duration_seconds"
+            )
+        handling_ticks = self.mean_handling_time_seconds / self.tick_seconds
+        if handling_ticks > MAX_HANDLING_TIME_TICKS:
+            raise ValueError("Шаг моделирования слишком мал для такого времени обработки")
+        if math.ceil(handling_ticks * HANDLING_TIME_CAP_FACTOR) * operators > MAX_RELEASE_BUFFER_CELLS:
+            raise ValueError("Шаг моделирования слишком мал для такого времени обработки и числа операторов")
+        if self.expected_contacts > MAX_SIMULATION_CONTACTS:
+            raise ValueError(f"Ожидается больше {MAX_SIMULATION_CONTACTS} обращений за симуляцию")
+        return self
+
+    @property
+    def expected_contacts(self) -> float:
+        """Ожидаемое число обращений за симуляцию (средняя интенсивность профиля x длительность)"""
+        return sum(self.arrival_rates) / len(self.arrival_rates) * self.duration_seconds
+
+
+class OperatorSimulationStatsResponse(BaseModel):
+    """Итог симуляции по оператору"""
+    operator_id: int
+    weight: int
+    max_load: int
+    expected_share: float = Field(..., description="Доля веса среди активных операторов")
+    share: float = Field(..., description="Доля назначенных обращений")
+    time_at_capacity: float = Field(..., description="Доля времени на лимите max_load")
+    mean_load: float = Field(..., description="Средняя нагрузка")
+
+    class Config:
+        from_attributes = True
+
+
+class SimulationResponse(BaseModel):
+    """Итог симуляции распределения"""
+    contacts: int = Field(..., description="Сколько обращений поступило")
+    assigned: int = Field(..., description="Сколько получили оператора при поступлении")
+    unassigned: int = Field(..., description="Сколько не нашли свободного оператора")
+    unassigned_rate: float
+    operators: List[OperatorSimulationStatsResponse]
+
+    class Config:
+        from_attributes = True
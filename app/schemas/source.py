@@ -3,14 +3,27 @@ from __future__ import annotations
 from pydantic import BaseModel, Field
 from typing import List, Optional, TYPE_CHECKING
 
+from app.models.source import DistributionStrategy
+
+from app.schemas.base import LoadedRelationsResponse
+
 if TYPE_CHECKING:
-    from app.schemas.operator_source_weight import OperatorSourceWeightResponse
+    from app.schemas.operator_source_weight import OperatorSourceWeightFlatResponse
 
 
 class SourceBase(BaseModel):
     """Базовая схема источника"""
     name: str = Field(..., description="Название источника")
     code: str = Field(..., description="Уникальный код источника (например, bot_telegram)")
+    strategy: DistributionStrategy = Field(
+        default=DistributionStrategy.WEIGHTED_RANDOM,
+        description="Стратегия распределения (weighted_random, smooth_round_robin, headroom)"
+    )
+    contact_ttl_seconds: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Через сколько секунд активное обращение завершается автоматически"
+    )
 
 
 class SourceCreate(SourceBase):
@@ -18,10 +31,33 @@ class SourceCreate(SourceBase):
     pass
 
 
-class SourceResponse(SourceBase):
-    """Схема ответа с источником"""
+class SourceUpdate(BaseModel):
+    """Схема для обновления источника"""
+    name: Optional[str] = None
+    strategy: Optional[DistributionStrategy] = None
+    # null снимает TTL (обращения источника не завершаются автоматически)
+    contact_ttl_seconds: Optional[int] = Field(None, ge=1)
+
+
+class SourceFlatResponse(SourceBase):
+    """Схема источника без вложенных объектов"""
     id: int
-    operator_weights: Optional[List["OperatorSourceWeightResponse"]] = None
 
     class Config:
         from_attributes = True
+
+
+class SourceResponse(SourceFlatResponse, LoadedRelationsResponse):
+    """Схема ответа с источником"""
+    operator_weights: List["OperatorSourceWeightFlatResponse"] = Field(default_factory=list)
+
+    class Config:
+        from_attributes = True
+
+
+class SourceBacklogResponse(BaseModel):
+    """Очередь обращений источника, ожидающих оператора"""
+    source_id: int
+    code: Optional[str] = None
+    depth: int = Field(..., description="Сколько активных обращений без оператора")
+    oldest_wait_seconds: float = Field(..., description="Сколько ждет самое старое обращение")
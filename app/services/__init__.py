@@ -1,16 +1,88 @@
-from app.services.lead_service import get_or_create_lead
+from app.services.lead_service import (
+    get_or_create_lead,
+    get_or_create_lead_id,
+    get_or_create_leads,
+    lead_id_cache,
+)
 from app.services.distribution import (
     distribute_contact,
+    distribute_contacts_batch,
+    assign_operator,
     get_available_operators,
+    get_operators_headroom,
     get_operator_current_load,
     select_operator_by_weights,
+    reserve_operator_capacity,
+    release_operator_capacity,
+    reconcile_operator_loads,
+    assign_operators_bulk,
+    SelectionStrategy,
+    STRATEGIES,
+    get_strategy,
+    register_strategy,
+)
+from app.services.contact_lifecycle import (
+    complete_contacts,
+    release_operator_loads,
+    CompletionResult,
+)
+from app.services.ttl_sweeper import sweep_expired_contacts, contact_ttl_sweeper
+from app.services.reassignment import (
+    reassign_operator_contacts,
+    reassign_removed_operators,
+    ReassignmentResult,
+)
+from app.services.routing_config import apply_routing_config, RoutingConfigDiff
+from app.services.simulator import (
+    simulate_distribution,
+    SimulationResult,
+    OperatorSimulationStats,
+)
+from app.services.backlog import (
+    dispatch_backlog,
+    get_backlog_stats,
+    BacklogStats,
+    BacklogDispatcher,
+    backlog_dispatcher,
 )
 
 __all__ = [
     "get_or_create_lead",
+    "get_or_create_lead_id",
+    "lead_id_cache",
+    "get_or_create_leads",
     "distribute_contact",
+    "distribute_contacts_batch",
+    "assign_operator",
     "get_available_operators",
+    "get_operators_headroom",
     "get_operator_current_load",
     "select_operator_by_weights",
+    "reserve_operator_capacity",
+    "release_operator_capacity",
+    "reconcile_operator_loads",
+    "assign_operators_bulk",
+    "SelectionStrategy",
+    "STRATEGIES",
+    "get_strategy",
+    "register_strategy",
+    "complete_contacts",
+    "release_operator_loads",
+    "CompletionResult",
+    "sweep_expired_contacts",
+    "contact_ttl_sweeper",
+    "reassign_operator_contacts",
+    "reassign_removed_operators",
+    "ReassignmentResult",
+    "apply_routing_config",
+    "RoutingConfigDiff",
+    "simulate_distribution",
+    "SimulationResult",
+    "OperatorSimulationStats",
+    "dispatch_backlog",
+    "get_backlog_stats",
+    "BacklogStats",
+    "BacklogDispatcher",
+    "backlog_dispatcher",
 ]
 
@@ -0,0 +1,187 @@
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Callable, NamedTuple, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.contact import Contact, ContactStatus
+from app.services.distribution import assign_operators_bulk, release_operator_capacity
+from app.services.routing_cache import routing_cache
+
+logger = logging.getLogger(__name__)
+
+# Условие очереди: активные обращения без оператора (частичный индекс ix_contacts_unassigned)
+UNASSIGNED = (Contact.operator_id.is_(None), Contact.status == ContactStatus.ACTIVE.value)
+
+
+class BacklogStats(NamedTuple):
+    """Очередь обращений без оператора по источнику"""
+    source_id: int
+    depth: int
+    oldest_created_at: datetime
+
+
+def get_backlog_stats(db: Session) -> list[BacklogStats]:
+    """
+    Размер очереди и самое старое обращение без оператора по источникам.
+
+    Один GROUP BY по диапазону индекса (operator_id IS NULL, status = 'active').
+
+    Returns:
+        list[BacklogStats]: Источники с непустой очередью
+    """
+    rows = (
+        db.query(Contact.source_id, func.count(Contact.id), func.min(Contact.created_at))
+        .filter(*UNASSIGNED)
+        .group_by(Contact.source_id)
+        .order_by(Contact.source_id)
+        .all()
+    )
+    return [BacklogStats(*row) for row in rows]
+
+
+def _dispatch_source(db: Session, source_id: int, batch_size: int) -> int:
+    """Раздать очередь одного источника, пока есть обращения и емкость операторов"""
+    route = routing_cache.get_table(db).by_id.get(source_id)
+    if route is None:
+        return 0
+
+    dispatched = 0
+    while True:
+        contact_ids = db.execute(
+            select(Contact.id)
+            .where(Contact.source_id == source_id, *UNASSIGNED)
+            .order_by(Contact.created_at, Contact.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not contact_ids:
+            break
+
+        ids_by_operator: dict[int, list[int]] = {}
+        operator_ids = assign_operators_bulk(db, route, len(contact_ids))
+        for contact_id, operator_id in zip(contact_ids, operator_ids):
+            if operator_id is not None:
+                ids_by_operator.setdefault(operator_id, []).append(contact_id)
+
+        assigned = 0
+        for operator_id, ids in ids_by_operator.items():
+            # Обращение могли завершить, пока оно ждало: резерв за него возвращается
+            updated = db.execute(
+                update(Contact)
+                .where(Contact.id.in_(ids), *UNASSIGNED)
+                .values(operator_id=operator_id)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if updated < len(ids):
+                release_operator_capacity(db, operator_id, len(ids) - updated)
+            assigned += updated
+        db.commit()
+
+        dispatched += assigned
+        if len(contact_ids) < batch_size or assigned < len(contact_ids):
+            # Очередь исчерпана или у операторов кончилась емкость
+            break
+    return dispatched
+
+
+def dispatch_backlog(db: Session, batch_size: int) -> dict[int, int]:
+    """
+    Назначить операторов обращениям, созданным без оператора.
+
+    Очередь каждого источника разбирается по возрастанию created_at порциями
+    по batch_size: операторы выбираются той же стратегией источника и с тем же
+    резервом нагрузки, что и при пакетном создании обращений
+    (assign_operators_bulk), каждая порция — отдельной транзакцией.
+
+    Args:
+        db: Сессия БД
+        batch_size: Сколько обращений распределять одной транзакцией
+
+    Returns:
+        dict[int, int]: source_id -> сколько обращений получили оператора
+    """
+    source_ids = [stats.source_id for stats in get_backlog_stats(db)]
+    db.commit()
+
+    dispatched = Counter()
+    for source_id in source_ids:
+        count = _dispatch_source(db, source_id, batch_size)
+        if count:
+            dispatched[source_id] = count
+    return dict(dispatched)
+
+
+class BacklogDispatcher:
+    """
+    Фоновая раздача очереди обращений без оператора.
+
+    Поток разбирает очередь раз в interval секунд и сразу после notify() —
+    его вызывают там, где освобождается емкость: завершение обращений,
+    изменение оператора (активация, рост max_load), перенастройка весов.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        interval: float,
+        batch_size: int
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self._wake_event = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """Запущен ли поток раздачи"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Запустить поток раздачи (interval <= 0 — раздача отключена)"""
+        if self.running or self.interval <= 0:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="backlog-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Остановить поток раздачи"""
+        if not self.running:
+            return
+        self._stopping = True
+        self._wake_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def notify(self) -> None:
+        """Сообщить, что у операторов появилась емкость: разобрать очередь сейчас"""
+        self._wake_event.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake_event.wait(self.interval)
+            self._wake_event.clear()
+            if self._stopping:
+                break
+            try:
+                with self.session_factory() as db:
+                    dispatched = dispatch_backlog(db, self.batch_size)
+                if dispatched:
+                    logger.info("Из очереди назначены операторы: %s", dispatched)
+            except Exception:
+                logger.exception("Ошибка при раздаче очереди обращений")
+
+
+backlog_dispatcher = BacklogDispatcher(
+    session_factory=SessionLocal,
+    interval=settings.backlog_dispatch_interval,
+    batch_size=settings.backlog_dispatch_batch,
+)
@@ -0,0 +1,123 @@
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional
+from sqlalchemy import String, bindparam, func, select, type_coerce, update
+from sqlalchemy.orm import Session
+
+from app.database import to_sqlite_timestamp
+from app.models.contact import Contact, ContactStatus
+from app.models.operator import Operator
+from app.services.backlog import backlog_dispatcher
+from app.services.lead_service import IN_CHUNK_SIZE
+
+
+class CompletionResult(NamedTuple):
+    """Итог завершения обращений"""
+    completed: int
+    # Сколько нагрузки освобождено у каждого оператора
+    released_by_operator: dict[int, int]
+
+
+def release_operator_loads(db: Session, released_by_operator: dict[int, int]) -> None:
+    """
+    Уменьшить счетчики active_load сразу нескольких операторов.
+
+    Один executemany вместо UPDATE на каждого оператора; счетчик не опускается
+    ниже нуля. Вызывается в транзакции, меняющей статусы обращений.
+
+    Args:
+        db: Сессия БД
+        released_by_operator: operator_id -> сколько контактов освобождено
+    """
+    if not released_by_operator:
+        return
+    operators = Operator.__table__
+    db.execute(
+        update(operators)
+        .where(operators.c.id == bindparam("b_operator_id"))
+        .values(active_load=func.max(operators.c.active_load - bindparam("b_amount"), 0)),
+        [
+            {"b_operator_id": operator_id, "b_amount": amount}
+            for operator_id, amount in released_by_operator.items()
+        ]
+    )
+
+
+def complete_contacts(
+    db: Session,
+    contact_ids: Optional[Iterable[int]] = None,
+    operator_id: Optional[int] = None,
+    source_id: Optional[int] = None,
+    older_than: Optional[datetime] = None,
+    limit: Optional[int] = None
+) -> CompletionResult:
+    """
+    Завершить активные обращения, подходящие под все заданные условия.
+
+    Статусы меняются set-based запросом
+    UPDATE contacts SET status = 'completed' WHERE status = 'active' AND ...
+    RETURNING operator_id, по возвращенным operator_id в той же транзакции
+    освобождается нагрузка операторов. Уже завершенные обращения не затрагиваются,
+    поэтому повторный вызов безопасен.
+
+    Args:
+        db: Сессия БД
+        contact_ids: ID обращений (передаются порциями по IN_CHUNK_SIZE)
+        operator_id: Только обращения оператора
+        source_id: Только обращения источника
+        older_than: Только обращения, созданные раньше этого момента (UTC)
+        limit: Завершить не больше limit самых старых обращений
+
+    Returns:
+        CompletionResult: Количество завершенных обращений и освобожденная нагрузка
+    """
+    conditions = [Contact.status == ContactStatus.ACTIVE.value]
+    if operator_id is not None:
+        conditions.append(Contact.operator_id == operator_id)
+    if source_id is not None:
+        conditions.append(Contact.source_id == source_id)
+    if older_than is not None:
+        conditions.append(
+            type_coerce(Contact.created_at, String) < to_sqlite_timestamp(older_than)
+        )
+
+    if contact_ids is None:
+        id_chunks = [None]
+    else:
+        ids = list(dict.fromkeys(contact_ids))
+        id_chunks = [ids[i:i + IN_CHUNK_SIZE] for i in range(0, len(ids), IN_CHUNK_SIZE)]
+
+    operator_ids = []
+    for chunk in id_chunks:
+        chunk_conditions = list(conditions)
+        if chunk is not None:
+            chunk_conditions.append(Contact.id.in_(chunk))
+        if limit is not None:
+            # SQLite без SQLITE_ENABLE_UPDATE_DELETE_LIMIT не поддерживает
+            # UPDATE ... LIMIT: ограничиваем подзапросом по ID
+            chunk_conditions = [Contact.id.in_(
+                select(Contact.id)
+                .where(*chunk_conditions)
+                .order_by(Contact.created_at, Contact.id)
+                .limit(limit - len(operator_ids))
+            )]
+        operator_ids += db.execute(
+            update(Contact)
+            .where(*chunk_conditions)
+            .values(status=ContactStatus.COMPLETED.value)
+            .returning(Contact.operator_id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        if limit is not None and len(operator_ids) >= limit:
+            break
+
+    released_by_operator = dict(Counter(
+        assigned_id for assigned_id in operator_ids if assigned_id is not None
+    ))
+    release_operator_loads(db, released_by_operator)
+    db.commit()
+    if released_by_operator:
+        # Освободилась емкость: раздать обращения, ждущие оператора
+        backlog_dispatcher.notify()
+
+    return CompletionResult(len(operator_ids), released_by_operator)
@@ -1,12 +1,17 @@
 import random
-from typing import Optional
+import threading
+from contextvars import ContextVar
+from typing import Collection, Optional, Sequence, Union
+from sqlalchemy import func, insert, update
 from sqlalchemy.orm import Session
 
+from app.metrics import metrics, record_contact_assignment, stage_timer
 from app.models.operator import Operator
-from app.models.source import Source
+from app.models.source import DistributionStrategy
 from app.models.contact import Contact, ContactStatus
 from app.models.operator_source_weight import OperatorSourceWeight
-from app.services.lead_service import get_or_create_lead
+from app.services.lead_service import get_or_create_lead_id, get_or_create_leads
+from app.services.routing_cache import RouteOperator, SourceRoute, routing_cache
 
 
 def get_operator_current_load(db: Session, operator_id: int) -> int:
@@ -38,6 +43,9 @@ def get_available_operators(
     - Его текущая нагрузка не превышает лимит (max_load)
     - Для него задан вес для данного источника
     
+    Нагрузка берется из счетчика Operator.active_load, поэтому выборка — один
+    запрос weights ⋈ operators без подсчета контактов.
+    
     Args:
         db: Сессия БД
         source_id: ID источника
@@ -45,28 +53,111 @@ def get_available_operators(
     Returns:
         list[tuple[Operator, int]]: Список кортежей (оператор, вес)
     """
-    # Получаем всех операторов с весами для данного источника
-    operator_weights = db.query(OperatorSourceWeight).filter(
-        OperatorSourceWeight.source_id == source_id
-    ).all()
+    rows = (
+        db.query(Operator, OperatorSourceWeight.weight)
+        .join(OperatorSourceWeight, OperatorSourceWeight.operator_id == Operator.id)
+        .filter(
+            OperatorSourceWeight.source_id == source_id,
+            Operator.is_active.is_(True),
+            Operator.active_load < Operator.max_load,
+        )
+        .order_by(Operator.id)
+        .all()
+    )
+    
+    return [(operator, weight) for operator, weight in rows]
+
+
+def reserve_operator_capacity(db: Session, operator_id: int, amount: int = 1) -> bool:
+    """
+    Зарезервировать нагрузку оператора одним условным UPDATE.
     
-    available_operators = []
+    UPDATE operators SET active_load = active_load + :amount
+    WHERE id = :id AND is_active AND active_load + :amount <= max_load
     
-    for op_weight in operator_weights:
-        operator = op_weight.operator
-        
-        # Проверяем, что оператор активен
-        if not operator.is_active:
-            continue
-        
-        # Проверяем лимит нагрузки
-        current_load = get_operator_current_load(db, operator.id)
-        if current_load >= operator.max_load:
-            continue
-        
-        available_operators.append((operator, op_weight.weight))
+    Проверка лимита и резервирование выполняются атомарно, поэтому параллельные
+    запросы не могут превысить max_load. Резерв фиксируется вместе с транзакцией,
+    в которой создается обращение.
+    
+    Args:
+        db: Сессия БД
+        operator_id: ID оператора
+        amount: Сколько контактов резервируется
+    
+    Returns:
+        bool: True, если резерв получен
+    """
+    result = db.execute(
+        update(Operator)
+        .where(
+            Operator.id == operator_id,
+            Operator.is_active.is_(True),
+            Operator.active_load + amount <= Operator.max_load,
+        )
+        .values(active_load=Operator.active_load + amount)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def release_operator_capacity(db: Session, operator_id: int, amount: int = 1) -> None:
+    """
+    Освободить нагрузку оператора, когда контакты перестают быть активными.
+    
+    Вызывается в той же транзакции, что и смена статуса контактов.
+    Счетчик не опускается ниже нуля.
     
-    return available_operators
+    Args:
+        db: Сессия БД
+        operator_id: ID оператора
+        amount: Сколько контактов освобождается
+    """
+    db.execute(
+        update(Operator)
+        .where(Operator.id == operator_id)
+        .values(active_load=func.max(Operator.active_load - amount, 0))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reconcile_operator_loads(db: Session) -> list[tuple[int, int, int]]:
+    """
+    Пересчитать счетчики active_load по таблице contacts.
+    
+    Используется для исправления расхождений (ручные правки БД, сбои).
+    Подсчет выполняется одним GROUP BY по индексу ix_contacts_operator_status.
+    
+    Args:
+        db: Сессия БД
+    
+    Returns:
+        list[tuple[int, int, int]]: (operator_id, старое значение, фактическое значение)
+            для операторов, у которых счетчик был исправлен
+    """
+    actual_loads = dict(
+        db.query(Contact.operator_id, func.count(Contact.id))
+        .filter(
+            Contact.operator_id.is_not(None),
+            Contact.status == ContactStatus.ACTIVE.value,
+        )
+        .group_by(Contact.operator_id)
+        .all()
+    )
+    
+    corrections = []
+    for operator_id, previous_load in db.query(Operator.id, Operator.active_load).all():
+        actual_load = actual_loads.get(operator_id, 0)
+        if previous_load != actual_load:
+            db.execute(
+                update(Operator)
+                .where(Operator.id == operator_id)
+                .values(active_load=actual_load)
+                .execution_options(synchronize_session=False)
+            )
+            corrections.append((operator_id, previous_load, actual_load))
+    
+    db.commit()
+    return corrections
 
 
 def select_operator_by_weights(
@@ -109,6 +200,279 @@ def select_operator_by_weights(
     return available_operators[-1][0]
 
 
+class SelectionStrategy:
+    """
+    Базовая стратегия выбора оператора для источника.
+    
+    Стратегия получает маршрут источника из снимка маршрутизации и не обращается
+    к БД. Выбор должен выполняться за O(n) или быстрее.
+    """
+    
+    name: str = ""
+    # Нужна ли стратегии свободная емкость операторов (одна выборка
+    # get_available_operators на обращение)
+    uses_headroom: bool = False
+    
+    def select(
+        self,
+        route: SourceRoute,
+        excluded: Collection[RouteOperator] = (),
+        headroom: Optional[dict[int, int]] = None
+    ) -> Optional[RouteOperator]:
+        """
+        Выбрать оператора.
+        
+        Args:
+            route: Маршрут источника
+            excluded: Операторы, которых нельзя выбирать (не удалось зарезервировать нагрузку)
+            headroom: Свободная емкость операторов {operator_id: max_load - active_load},
+                передается только стратегиям с uses_headroom
+        
+        Returns:
+            Optional[RouteOperator]: Выбранный оператор или None
+        """
+        raise NotImplementedError
+    
+    def reselect(
+        self,
+        route: SourceRoute,
+        failed: RouteOperator,
+        excluded: Collection[RouteOperator] = (),
+        headroom: Optional[dict[int, int]] = None
+    ) -> Optional[RouteOperator]:
+        """
+        Повторить выбор для того же обращения, если нагрузку failed не удалось
+        зарезервировать.
+        
+        Стратегии с состоянием переопределяют метод, чтобы повтор не считался
+        новым выбором. По умолчанию — обычный select.
+        
+        Args:
+            route: Маршрут источника
+            failed: Оператор, выбранный предыдущим вызовом (входит в excluded)
+            excluded: Операторы, которых нельзя выбирать
+            headroom: Свободная емкость операторов (для стратегий с uses_headroom)
+        
+        Returns:
+            Optional[RouteOperator]: Выбранный оператор или None
+        """
+        return self.select(route, excluded, headroom)
+
+
+class WeightedRandomStrategy(SelectionStrategy):
+    """Случайный выбор с вероятностью, пропорциональной весу"""
+    
+    name = DistributionStrategy.WEIGHTED_RANDOM.value
+    
+    def select(self, route, excluded=(), headroom=None):
+        return route.sampler.draw_excluding(excluded)
+
+
+# Списание последнего выбора SmoothWeightedRoundRobinStrategy в текущем контексте
+# (запросе): (стратегия, source_id, версия маршрутизации, operator_id, списание).
+# select и reselect одного обращения выполняются в одном контексте; копия
+# контекста передается в пул потоков FastAPI и в greenlet асинхронного режима
+_last_charge: ContextVar[Optional[tuple]] = ContextVar("swrr_last_charge", default=None)
+
+
+class SmoothWeightedRoundRobinStrategy(SelectionStrategy):
+    """
+    Плавный взвешенный round-robin (алгоритм nginx).
+    
+    На каждом выборе текущий вес каждого оператора увеличивается на его вес,
+    выбирается оператор с максимальным текущим весом, и его текущий вес
+    уменьшается на сумму весов. Для весов 10/30 последовательность
+    детерминирована и не дает перекосов на коротких окнах.
+    
+    Состояние хранится в памяти процесса отдельно для каждого источника
+    и сбрасывается при смене версии маршрутизации (удаленные операторы
+    не сохраняют текущий вес). Повтор выбора после неудачного резерва
+    (reselect) не увеличивает веса еще раз: раунд пересчитывается так, будто
+    оператор без емкости был исключен сразу, поэтому доли остальных
+    операторов не смещаются. Списание выбора хранится в контексте запроса,
+    поэтому параллельные запросы, выбравшие того же оператора, не путают
+    свои списания.
+    """
+    
+    name = DistributionStrategy.SMOOTH_ROUND_ROBIN.value
+    
+    def __init__(self):
+        # source_id -> (версия маршрутизации, текущие веса)
+        self._state: dict[int, tuple[int, dict[int, int]]] = {}
+        self._lock = threading.Lock()
+    
+    def _current_weights(self, route: SourceRoute) -> dict[int, int]:
+        state = self._state.get(route.source_id)
+        if state is None or state[0] != route.version:
+            state = self._state[route.source_id] = (route.version, {})
+        return state[1]
+    
+    def _charge(self, route, selected, current_weights, charge):
+        current_weights[selected.operator_id] -= charge
+        _last_charge.set((self, route.source_id, route.version, selected.operator_id, charge))
+        return selected
+    
+    def _select_locked(self, route, excluded):
+        current_weights = self._current_weights(route)
+        eligible = [
+            operator for operator in route.operators
+            if operator.is_active and operator not in excluded
+        ]
+        if not eligible:
+            _last_charge.set(None)
+            return None
+        
+        total_weight = 0
+        for operator in eligible:
+            current_weights[operator.operator_id] = (
+                current_weights.get(operator.operator_id, 0) + operator.weight
+            )
+            total_weight += operator.weight
+        selected = max(eligible, key=lambda operator: current_weights[operator.operator_id])
+        return self._charge(route, selected, current_weights, total_weight)
+    
+    def select(self, route, excluded=(), headroom=None):
+        with self._lock:
+            return self._select_locked(route, excluded)
+    
+    def reselect(self, route, failed, excluded=(), headroom=None):
+        with self._lock:
+            current_weights = self._current_weights(route)
+            last_charge = _last_charge.get()
+            if last_charge is None or last_charge[:4] != (
+                self, route.source_id, route.version, failed.operator_id
+            ):
+                # Списания этого выбора нет (версия маршрутизации сменилась
+                # или выбор сделан в другом контексте): обычный выбор
+                return self._select_locked(route, excluded)
+            # Раунд пересчитывается так, будто failed был исключен с самого начала:
+            # снимаются и его списание, и его прибавка, сумма весов раунда уменьшается
+            charge = last_charge[4]
+            current_weights[failed.operator_id] += charge - failed.weight
+            charge -= failed.weight
+            
+            eligible = [
+                operator for operator in route.operators
+                if operator.is_active and operator not in excluded
+            ]
+            if not eligible:
+                _last_charge.set(None)
+                return None
+            selected = max(eligible, key=lambda operator: current_weights[operator.operator_id])
+            return self._charge(route, selected, current_weights, charge)
+
+
+class HeadroomStrategy(SelectionStrategy):
+    """
+    Случайный выбор с весом, масштабированным свободной емкостью.
+    
+    Эффективный вес = weight * (max_load - active_load): оператор, близкий
+    к лимиту, получает меньше трафика.
+    """
+    
+    name = DistributionStrategy.HEADROOM.value
+    uses_headroom = True
+    
+    def select(self, route, excluded=(), headroom=None):
+        if headroom is None:
+            return route.sampler.draw_excluding(excluded)
+        
+        weighted = [
+            (operator, operator.weight * headroom[operator.operator_id])
+            for operator in route.operators
+            if operator.is_active
+            and operator not in excluded
+            and headroom.get(operator.operator_id, 0) > 0
+        ]
+        return select_operator_by_weights(weighted)
+
+
+DEFAULT_STRATEGY = DistributionStrategy.WEIGHTED_RANDOM.value
+
+# Реестр стратегий: имя (Source.strategy) -> стратегия
+STRATEGIES: dict[str, SelectionStrategy] = {}
+
+
+def register_strategy(strategy: SelectionStrategy) -> None:
+    """Зарегистрировать стратегию распределения под ее именем"""
+    STRATEGIES[strategy.name] = strategy
+
+
+def get_strategy(name: Optional[str]) -> SelectionStrategy:
+    """Получить стратегию по имени (неизвестное имя — стратегия по умолчанию)"""
+    return STRATEGIES.get(name) or STRATEGIES[DEFAULT_STRATEGY]
+
+
+register_strategy(WeightedRandomStrategy())
+register_strategy(SmoothWeightedRoundRobinStrategy())
+register_strategy(HeadroomStrategy())
+
+
+def get_operators_headroom(db: Session, source_id: int) -> dict[int, int]:
+    """
+    Свободная емкость доступных операторов источника.
+    
+    Args:
+        db: Сессия БД
+        source_id: ID источника
+    
+    Returns:
+        dict[int, int]: operator_id -> max_load - active_load (только доступные операторы)
+    """
+    return {
+        operator.id: operator.max_load - operator.active_load
+        for operator, _ in get_available_operators(db, source_id)
+    }
+
+
+def assign_operator(
+    db: Session,
+    route: SourceRoute,
+    strategy: Optional[SelectionStrategy] = None,
+    headroom: Optional[dict[int, int]] = None
+) -> Optional[int]:
+    """
+    Выбрать оператора для источника и зарезервировать его нагрузку.
+    
+    Лимит проверяется при резервировании условным UPDATE (защита от race
+    condition), поэтому снимок маршрутизации может быть слегка устаревшим
+    без риска превысить max_load. Оператор, которого не удалось
+    зарезервировать, исключается из повторного выбора. После первого отказа
+    свободная емкость источника читается одним запросом, и все операторы
+    на лимите исключаются сразу: насыщенный источник стоит два запроса,
+    а не неудачный UPDATE на каждого оператора.
+    
+    Args:
+        db: Сессия БД
+        route: Маршрут источника из снимка маршрутизации
+        strategy: Стратегия выбора (по умолчанию — стратегия источника)
+        headroom: Свободная емкость операторов для стратегий с uses_headroom
+    
+    Returns:
+        Optional[int]: ID оператора или None, если свободных операторов нет
+    """
+    strategy = strategy or get_strategy(route.strategy)
+    saturated = set()
+    capacity_checked = False
+    candidate = strategy.select(route, saturated, headroom)
+    while candidate is not None:
+        if reserve_operator_capacity(db, candidate.operator_id):
+            return candidate.operator_id
+        saturated.add(candidate)
+        if not capacity_checked:
+            capacity_checked = True
+            available = get_operators_headroom(db, route.source_id)
+            saturated.update(
+                operator for operator in route.operators
+                if available.get(operator.operator_id, 0) <= 0
+            )
+            if strategy.uses_headroom:
+                headroom = available
+        # Повтор для того же обращения, а не новый выбор (важно для стратегий с состоянием)
+        candidate = strategy.reselect(route, candidate, saturated, headroom)
+    return None
+
+
 def distribute_contact(
     db: Session,
     external_id: str,
@@ -118,11 +482,12 @@ def distribute_contact(
     Распределить обращение лида между операторами.
     
     Алгоритм:
-    1. Найти или создать лида по external_id
-    2. Найти источник по code
-    3. Найти доступных операторов (активные, не превысили лимит)
-    4. Выбрать оператора по весам (вероятностный выбор)
-    5. Создать обращение
+    1. Найти источник по code (в кэше маршрутизации)
+    2. Найти или создать лида по external_id (кэш, затем upsert без commit)
+    3. Найти доступных операторов (активные, по снимку маршрутизации)
+    4. Выбрать оператора стратегией источника (по умолчанию — вероятностный
+       выбор по весам) и атомарно зарезервировать его нагрузку (Operator.active_load)
+    5. Создать обращение (в той же транзакции, что и резерв)
     
     Если подходящих операторов нет, создается обращение без оператора.
     
@@ -134,44 +499,174 @@ def distribute_contact(
     Returns:
         Contact: Созданное обращение
     """
-    # 1. Найти или создать лида
-    lead = get_or_create_lead(db, external_id)
+    # Время этапов — в метрике crm_distribute_stage_seconds (если метрики включены)
+    timer = stage_timer()
     
-    # 2. Найти источник
-    source = db.query(Source).filter(Source.code == source_code).first()
-    if not source:
+    # 1. Найти источник в снимке маршрутизации (без обращения к БД)
+    route = routing_cache.get_source(db, source_code)
+    if route is None:
         raise ValueError(f"Источник с кодом '{source_code}' не найден")
+    timer.mark("source")
     
-    # 3. Найти доступных операторов
-    available_operators = get_available_operators(db, source.id)
-    
-    # 4. Выбрать оператора по весам
-    selected_operator = None
-    if available_operators:
-        # Проверяем лимиты еще раз перед выбором (защита от race condition)
-        # Фильтруем только тех, кто еще не превысил лимит
-        valid_operators = [
-            (op, weight) for op, weight in available_operators
-            if get_operator_current_load(db, op.id) < op.max_load
-        ]
-        
-        if valid_operators:
-            selected_operator = select_operator_by_weights(valid_operators)
-            # Финальная проверка лимита перед созданием (дополнительная защита)
-            if selected_operator and get_operator_current_load(db, selected_operator.id) >= selected_operator.max_load:
-                selected_operator = None
+    # 2. Найти или создать лида (в той же транзакции, что и обращение)
+    lead_id = get_or_create_lead_id(db, external_id)
+    timer.mark("lead")
+    
+    # 3. Стратегия источника; емкость операторов читается одним запросом
+    # только для стратегий, которым она нужна
+    strategy = get_strategy(route.strategy)
+    headroom = get_operators_headroom(db, route.source_id) if strategy.uses_headroom else None
+    timer.mark("availability")
+    
+    # 4. Выбрать оператора и зарезервировать его нагрузку
+    selected_operator_id = assign_operator(db, route, strategy, headroom)
+    timer.mark("selection")
     
     # 5. Создать обращение
     contact = Contact(
-        lead_id=lead.id,
-        source_id=source.id,
-        operator_id=selected_operator.id if selected_operator else None,
+        lead_id=lead_id,
+        source_id=route.source_id,
+        operator_id=selected_operator_id,
         status=ContactStatus.ACTIVE.value
     )
     
     db.add(contact)
     db.commit()
     db.refresh(contact)
+    timer.mark("commit")
+    record_contact_assignment(source_code, selected_operator_id)
     
     return contact
 
+
+def assign_operators_bulk(
+    db: Session,
+    route: SourceRoute,
+    count: int,
+    strategy: Optional[SelectionStrategy] = None
+) -> list[Optional[int]]:
+    """
+    Выбрать операторов для count обращений источника и зарезервировать нагрузку.
+    
+    Емкость операторов читается одним запросом, операторы выбираются
+    в памяти с учетом емкости, уже занятой этими же обращениями, затем
+    нагрузка резервируется одним условным UPDATE на оператора. Если емкость
+    оператора успела измениться, его обращения распределяются по одному.
+    
+    Args:
+        db: Сессия БД
+        route: Маршрут источника из снимка маршрутизации
+        count: Сколько обращений распределить
+        strategy: Стратегия выбора (по умолчанию — стратегия источника)
+    
+    Returns:
+        list[Optional[int]]: ID оператора для каждого обращения (None — свободных нет)
+    """
+    strategy = strategy or get_strategy(route.strategy)
+    headroom = get_operators_headroom(db, route.source_id)
+    saturated = {
+        operator for operator in route.operators
+        if headroom.get(operator.operator_id, 0) <= 0
+    }
+    planned: dict[int, list[int]] = {}
+    for slot in range(count):
+        operator = strategy.select(route, saturated, headroom)
+        if operator is None:
+            break
+        headroom[operator.operator_id] -= 1
+        if headroom[operator.operator_id] <= 0:
+            saturated.add(operator)
+        planned.setdefault(operator.operator_id, []).append(slot)
+    
+    assigned: list[Optional[int]] = [None] * count
+    for operator_id, slots in planned.items():
+        if reserve_operator_capacity(db, operator_id, len(slots)):
+            for slot in slots:
+                assigned[slot] = operator_id
+        else:
+            for slot in slots:
+                assigned[slot] = assign_operator(db, route, strategy)
+    return assigned
+
+
+def distribute_contacts_batch(
+    db: Session,
+    items: Sequence[tuple[str, str]]
+) -> list[Union[Contact, ValueError]]:
+    """
+    Распределить пачку обращений в одной транзакции.
+    
+    Алгоритм:
+    1. Источники берутся из снимка маршрутизации один раз на каждый код
+    2. Лиды ищутся одним запросом IN, недостающие создаются массовой вставкой
+    3. Для каждого источника емкость операторов читается один раз, операторы
+       выбираются в памяти с учетом емкости, занятой обращениями этой же пачки
+    4. Нагрузка резервируется одним условным UPDATE на оператора; если емкость
+       оператора успела измениться, его обращения распределяются по одному
+    5. Все обращения вставляются и фиксируются одним commit
+    
+    Args:
+        db: Сессия БД
+        items: Пары (external_id, source_code)
+    
+    Returns:
+        list[Union[Contact, ValueError]]: Для каждого элемента (в порядке входа)
+            созданное обращение или ошибка (например, неизвестный источник).
+            Обращения отсоединены от сессии и содержат все поля.
+    """
+    results: list[Union[Contact, ValueError, None]] = [None] * len(items)
+    
+    # 1. Источники — один раз на код
+    routes = {
+        source_code: routing_cache.get_source(db, source_code)
+        for source_code in {source_code for _, source_code in items}
+    }
+    indexes_by_code: dict[str, list[int]] = {}
+    for index, (_, source_code) in enumerate(items):
+        if routes[source_code] is None:
+            results[index] = ValueError(f"Источник с кодом '{source_code}' не найден")
+        else:
+            indexes_by_code.setdefault(source_code, []).append(index)
+    
+    # 2. Лиды — один IN-запрос и одна массовая вставка
+    lead_ids = get_or_create_leads(
+        db,
+        (items[index][0] for indexes in indexes_by_code.values() for index in indexes)
+    )
+    
+    rows = []
+    row_indexes = []
+    for source_code, indexes in indexes_by_code.items():
+        route = routes[source_code]
+        
+        # 3-4. Выбор операторов в памяти и резерв одним UPDATE на оператора
+        operator_ids = assign_operators_bulk(db, route, len(indexes))
+        
+        for index, operator_id in zip(indexes, operator_ids):
+            rows.append({
+                "lead_id": lead_ids[items[index][0]],
+                "source_id": route.source_id,
+                "operator_id": operator_id,
+                "status": ContactStatus.ACTIVE.value,
+            })
+            row_indexes.append(index)
+    
+    # 5. Массовая вставка (INSERT ... VALUES (...), (...) RETURNING) и один commit
+    # на всю пачку. SQLite не гарантирует порядок строк RETURNING, поэтому
+    # SQLAlchemy возвращает их в порядке rows (sort_by_parameter_order).
+    # Обращения отсоединяются от сессии, чтобы commit не сбросил их поля.
+    if rows:
+        contacts = db.scalars(
+            insert(Contact).returning(Contact, sort_by_parameter_order=True), rows
+        ).all()
+        for index, contact in zip(row_indexes, contacts):
+            results[index] = contact
+            db.expunge(contact)
+    db.commit()
+    
+    if metrics.enabled:
+        for source_code, indexes in indexes_by_code.items():
+            for index in indexes:
+                record_contact_assignment(source_code, results[index].operator_id)
+    
+    return results
@@ -1,11 +1,104 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.models.lead import Lead
 
+# Сколько значений передавать в одном IN (...) — с запасом от лимита переменных SQLite
+IN_CHUNK_SIZE = 500
+
+
+class LeadIdCache:
+    """
+    Ограниченный LRU-кэш external_id -> lead_id.
+    
+    Большая часть трафика — повторные обращения существующих лидов, для них
+    поиск лида не требует запроса к БД. В кэш попадают только лиды,
+    найденные в БД (уже зафиксированные), поэтому откат транзакции
+    не оставляет в кэше несуществующих ID.
+    """
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, external_id: str) -> Optional[int]:
+        """Получить ID лида из кэша"""
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            lead_id = self._items.get(external_id)
+            if lead_id is not None:
+                self._items.move_to_end(external_id)
+            return lead_id
+    
+    def put(self, external_id: str, lead_id: int) -> None:
+        """Запомнить ID лида, вытесняя давно не использованные записи"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._items[external_id] = lead_id
+            self._items.move_to_end(external_id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Очистить кэш"""
+        with self._lock:
+            self._items.clear()
+
+
+lead_id_cache = LeadIdCache(maxsize=settings.lead_cache_size)
+
+
+def get_or_create_lead_id(db: Session, external_id: str) -> int:
+    """
+    Найти ID лида по external_id или создать лида.
+    
+    Порядок: LRU-кэш -> SELECT -> INSERT ... ON CONFLICT(external_id) DO NOTHING
+    RETURNING id. Вставка выполняется в текущей транзакции без commit, поэтому
+    лид фиксируется вместе с обращением. Если лида параллельно создал другой
+    запрос, вставка ничего не возвращает и ID читается повторным SELECT
+    (вместо ошибки уникальности).
+    
+    Args:
+        db: Сессия БД
+        external_id: Уникальный идентификатор лида (телефон, email, ID из бота)
+    
+    Returns:
+        int: ID лида
+    """
+    lead_id = lead_id_cache.get(external_id)
+    if lead_id is not None:
+        return lead_id
+    
+    lead_id = db.query(Lead.id).filter(Lead.external_id == external_id).scalar()
+    if lead_id is not None:
+        lead_id_cache.put(external_id, lead_id)
+        return lead_id
+    
+    lead_id = db.execute(
+        insert(Lead)
+        .values(external_id=external_id)
+        .on_conflict_do_nothing(index_elements=[Lead.external_id])
+        .returning(Lead.id)
+    ).scalar()
+    if lead_id is None:
+        lead_id = db.query(Lead.id).filter(Lead.external_id == external_id).scalar()
+    
+    return lead_id
+
 
 def get_or_create_lead(db: Session, external_id: str) -> Lead:
     """
     Найти существующего лида по external_id или создать нового.
     
+    Транзакция не фиксируется: новый лид сохраняется вместе с остальными
+    изменениями вызывающего кода.
+    
     Args:
         db: Сессия БД
         external_id: Уникальный идентификатор лида (телефон, email, ID из бота)
@@ -13,13 +106,57 @@ def get_or_create_lead(db: Session, external_id: str) -> Lead:
     Returns:
         Lead: Найденный или созданный лид
     """
-    lead = db.query(Lead).filter(Lead.external_id == external_id).first()
+    return db.get(Lead, get_or_create_lead_id(db, external_id))
+
+
+def _find_lead_ids(db: Session, external_ids: list[str]) -> dict[str, int]:
+    """Найти ID лидов по списку external_id (запросы IN порциями)"""
+    lead_ids = {}
+    for start in range(0, len(external_ids), IN_CHUNK_SIZE):
+        chunk = external_ids[start:start + IN_CHUNK_SIZE]
+        lead_ids.update(
+            db.query(Lead.external_id, Lead.id).filter(Lead.external_id.in_(chunk)).all()
+        )
+    return lead_ids
+
+
+def get_or_create_leads(db: Session, external_ids: Iterable[str]) -> dict[str, int]:
+    """
+    Найти или создать лидов для набора external_id.
     
-    if not lead:
-        lead = Lead(external_id=external_id)
-        db.add(lead)
-        db.commit()
-        db.refresh(lead)
+    Существующие лиды берутся из LRU-кэша или ищутся запросом IN, недостающие создаются одной массовой
+    вставкой (INSERT ... ON CONFLICT DO NOTHING — параллельно созданные лиды
+    не вызывают ошибку уникальности). Транзакция не фиксируется: вызывающий код
+    делает commit вместе с остальными изменениями.
     
-    return lead
-
+    Args:
+        db: Сессия БД
+        external_ids: Идентификаторы лидов (повторы допускаются)
+    
+    Returns:
+        dict[str, int]: external_id -> ID лида
+    """
+    unique_ids = list(dict.fromkeys(external_ids))
+    lead_ids = {}
+    not_cached = []
+    for external_id in unique_ids:
+        lead_id = lead_id_cache.get(external_id)
+        if lead_id is None:
+            not_cached.append(external_id)
+        else:
+            lead_ids[external_id] = lead_id
+    
+    found = _find_lead_ids(db, not_cached)
+    for external_id, lead_id in found.items():
+        lead_id_cache.put(external_id, lead_id)
+    lead_ids.update(found)
+    
+    missing = [external_id for external_id in unique_ids if external_id not in lead_ids]
+    if missing:
+        db.execute(
+            insert(Lead).on_conflict_do_nothing(index_elements=[Lead.external_id]),
+            [{"external_id": external_id} for external_id in missing]
+        )
+        lead_ids.update(_find_lead_ids(db, missing))
+    
+    return lead_ids
@@ -0,0 +1,135 @@
+from collections import Counter
+from typing import Iterable, NamedTuple, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.contact import Contact, ContactStatus
+from app.services.contact_lifecycle import release_operator_loads
+from app.services.distribution import assign_operators_bulk, release_operator_capacity
+from app.services.routing_cache import routing_cache
+
+
+class ReassignmentResult(NamedTuple):
+    """Итог переназначения активных обращений оператора"""
+    # Сколько обращений получил каждый новый оператор
+    reassigned_by_operator: dict[int, int]
+    # Сколько обращений ушло в очередь без оператора (свободной емкости не хватило)
+    unassigned: int
+
+    @property
+    def reassigned(self) -> int:
+        return sum(self.reassigned_by_operator.values())
+
+
+def reassign_operator_contacts(
+    db: Session,
+    operator_id: int,
+    source_ids: Optional[Iterable[int]] = None
+) -> ReassignmentResult:
+    """
+    Переназначить активные обращения оператора оставшимся операторам источников.
+
+    Вызывается после того, как оператор деактивирован или убран из источника
+    и снимок маршрутизации обновлен. Для каждого источника емкость операторов
+    читается один раз (assign_operators_bulk), затем обращения переносятся
+    UPDATE ... WHERE id IN (самые старые N) на каждого нового оператора.
+    Обращения, которым не хватило емкости, остаются без оператора и попадают
+    в очередь раздачи. Нагрузка старого оператора освобождается в той же транзакции.
+
+    Источники, где оператор по-прежнему активен в маршруте, пропускаются.
+
+    Args:
+        db: Сессия БД
+        operator_id: ID оператора, чьи обращения переназначаются
+        source_ids: Только обращения этих источников (по умолчанию — всех)
+
+    Returns:
+        ReassignmentResult: Сколько обращений получил каждый оператор и сколько ушло в очередь
+    """
+    pinned = (
+        Contact.operator_id == operator_id,
+        Contact.status == ContactStatus.ACTIVE.value,
+    )
+    counts_query = db.query(Contact.source_id, func.count(Contact.id)).filter(*pinned)
+    if source_ids is not None:
+        counts_query = counts_query.filter(Contact.source_id.in_(list(source_ids)))
+    counts = counts_query.group_by(Contact.source_id).all()
+
+    table = routing_cache.get_table(db)
+    reassigned_by_operator = Counter()
+    unassigned = 0
+    for source_id, count in counts:
+        route = table.by_id.get(source_id)
+        if route is not None and any(
+            operator.operator_id == operator_id and operator.is_active
+            for operator in route.operators
+        ):
+            continue
+        source_pinned = (*pinned, Contact.source_id == source_id)
+
+        planned = Counter()
+        if route is not None:
+            planned.update(
+                new_id for new_id in assign_operators_bulk(db, route, count)
+                if new_id is not None
+            )
+        for new_id, amount in planned.items():
+            # Самые старые обращения — первым; часть могла успеть завершиться
+            updated = db.execute(
+                update(Contact)
+                .where(Contact.id.in_(
+                    select(Contact.id)
+                    .where(*source_pinned)
+                    .order_by(Contact.created_at, Contact.id)
+                    .limit(amount)
+                ))
+                .values(operator_id=new_id)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if updated < amount:
+                release_operator_capacity(db, new_id, amount - updated)
+            if updated:
+                reassigned_by_operator[new_id] += updated
+
+        # Оставшиеся обращения источника — в очередь без оператора
+        unassigned += db.execute(
+            update(Contact)
+            .where(*source_pinned)
+            .values(operator_id=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    moved = sum(reassigned_by_operator.values()) + unassigned
+    if moved:
+        release_operator_loads(db, {operator_id: moved})
+    db.commit()
+
+    return ReassignmentResult(dict(reassigned_by_operator), unassigned)
+
+
+def reassign_removed_operators(
+    db: Session,
+    removed_operators: dict[int, list[int]]
+) -> ReassignmentResult:
+    """
+    Переназначить обращения операторов, убранных из источников.
+
+    Args:
+        db: Сессия БД
+        removed_operators: source_id -> операторы, убранные из источника
+
+    Returns:
+        ReassignmentResult: Суммарный итог по всем операторам
+    """
+    sources_by_operator: dict[int, list[int]] = {}
+    for source_id, operator_ids in removed_operators.items():
+        for operator_id in operator_ids:
+            sources_by_operator.setdefault(operator_id, []).append(source_id)
+
+    reassigned_by_operator = Counter()
+    unassigned = 0
+    for operator_id, source_ids in sorted(sources_by_operator.items()):
+        result = reassign_operator_contacts(db, operator_id, source_ids=source_ids)
+        reassigned_by_operator.update(result.reassigned_by_operator)
+        unassigned += result.unassigned
+    return ReassignmentResult(dict(reassigned_by_operator), unassigned)
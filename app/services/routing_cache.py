@@ -0,0 +1,209 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import NamedTuple, Optional
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.operator import Operator
+from app.models.source import Source
+from app.models.operator_source_weight import OperatorSourceWeight
+from app.models.routing_version import RoutingVersion
+from app.services.sampler import WeightedSampler
+
+ROUTING_VERSION_ID = 1
+
+
+class RouteOperator(NamedTuple):
+    """Оператор в таблице маршрутизации источника"""
+    operator_id: int
+    weight: int
+    max_load: int
+    is_active: bool
+
+
+@dataclass(frozen=True)
+class SourceRoute:
+    """Маршрут источника: его ID, стратегия распределения и операторы с весами"""
+    source_id: int
+    code: str
+    strategy: str
+    operators: tuple[RouteOperator, ...]
+    # Версия маршрутизации, из которой построен маршрут (состояние стратегий
+    # сбрасывается при ее смене)
+    version: int = 0
+
+    @cached_property
+    def sampler(self) -> WeightedSampler[RouteOperator]:
+        """
+        Таблица выбора по весам среди активных операторов.
+
+        Строится один раз на снимок: снимок пересоздается при любом изменении
+        весов или флагов операторов.
+        """
+        active_operators = [op for op in self.operators if op.is_active]
+        return WeightedSampler(active_operators, [op.weight for op in active_operators])
+
+
+@dataclass(frozen=True)
+class RoutingTable:
+    """Снимок конфигурации маршрутизации для определенной версии"""
+    version: int
+    by_code: dict[str, SourceRoute] = field(default_factory=dict)
+    by_id: dict[int, SourceRoute] = field(default_factory=dict)
+
+
+def get_routing_version(db: Session) -> int:
+    """
+    Получить текущую версию конфигурации маршрутизации из БД.
+
+    Args:
+        db: Сессия БД
+
+    Returns:
+        int: Версия (0, если конфигурация еще ни разу не менялась)
+    """
+    version = db.query(RoutingVersion.version).filter(
+        RoutingVersion.id == ROUTING_VERSION_ID
+    ).scalar()
+    return version or 0
+
+
+def bump_routing_version(db: Session) -> None:
+    """
+    Увеличить версию конфигурации маршрутизации.
+
+    Вызывается в транзакции, изменяющей источники, веса или операторов,
+    до commit: другие процессы увидят новую версию вместе с изменениями.
+
+    Args:
+        db: Сессия БД
+    """
+    statement = insert(RoutingVersion).values(id=ROUTING_VERSION_ID, version=1)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[RoutingVersion.id],
+            set_={"version": RoutingVersion.version + 1},
+        )
+    )
+
+
+def build_routing_table(db: Session) -> RoutingTable:
+    """
+    Построить снимок маршрутизации из БД.
+
+    Args:
+        db: Сессия БД
+
+    Returns:
+        RoutingTable: Источники с операторами, весами, лимитами и флагами активности
+    """
+    version = get_routing_version(db)
+
+    operators_by_source: dict[int, list[RouteOperator]] = {}
+    rows = (
+        db.query(
+            OperatorSourceWeight.source_id,
+            Operator.id,
+            OperatorSourceWeight.weight,
+            Operator.max_load,
+            Operator.is_active,
+        )
+        .join(Operator, Operator.id == OperatorSourceWeight.operator_id)
+        .order_by(OperatorSourceWeight.source_id, Operator.id)
+        .all()
+    )
+    for source_id, operator_id, weight, max_load, is_active in rows:
+        operators_by_source.setdefault(source_id, []).append(
+            RouteOperator(operator_id, weight, max_load, is_active)
+        )
+
+    table = RoutingTable(version=version)
+    for source_id, code, strategy in db.query(Source.id, Source.code, Source.strategy).all():
+        route = SourceRoute(
+            source_id=source_id,
+            code=code,
+            strategy=strategy,
+            operators=tuple(operators_by_source.get(source_id, ())),
+            version=version,
+        )
+        table.by_code[code] = route
+        table.by_id[source_id] = route
+
+    return table
+
+
+class RoutingCache:
+    """
+    Кэш таблицы маршрутизации в памяти процесса.
+
+    Снимок строится при старте приложения и перестраивается после изменений
+    конфигурации. Несколько воркеров узнают об изменениях другого процесса,
+    сверяя версию в БД не чаще одного раза в check_interval секунд.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._table: Optional[RoutingTable] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, db: Session) -> RoutingTable:
+        """
+        Перестроить снимок из БД.
+
+        Снимок строится без блокировки: в асинхронном режиме запросы отдают
+        управление event loop, и другая корутина, ждущая threading.Lock,
+        остановила бы весь цикл. Под блокировкой только заменяется ссылка;
+        снимок более старой версии не вытесняет более новый, построенный
+        параллельно.
+        """
+        table = build_routing_table(db)
+        with self._lock:
+            current = self._table
+            if current is not None and current.version > table.version:
+                table = current
+            else:
+                self._table = table
+            self._checked_at = time.monotonic()
+        return table
+
+    def get_table(self, db: Session, force_check: bool = False) -> RoutingTable:
+        """
+        Получить актуальный снимок маршрутизации.
+
+        Args:
+            db: Сессия БД
+            force_check: Сверить версию с БД независимо от check_interval
+
+        Returns:
+            RoutingTable: Снимок маршрутизации
+        """
+        table = self._table
+        if table is None:
+            return self.refresh(db)
+
+        now = time.monotonic()
+        if force_check or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            if get_routing_version(db) != table.version:
+                return self.refresh(db)
+
+        return table
+
+    def get_source(self, db: Session, source_code: str) -> Optional[SourceRoute]:
+        """
+        Найти маршрут источника по коду.
+
+        Если источника нет в снимке, версия сверяется с БД немедленно:
+        источник мог быть создан другим процессом.
+        """
+        route = self.get_table(db).by_code.get(source_code)
+        if route is None:
+            route = self.get_table(db, force_check=True).by_code.get(source_code)
+        return route
+
+
+routing_cache = RoutingCache(check_interval=settings.routing_check_interval)
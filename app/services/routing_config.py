@@ -0,0 +1,118 @@
+from typing import NamedTuple
+from sqlalchemy import bindparam, delete, insert, update
+from sqlalchemy.orm import Session
+
+from app.models.operator import Operator
+from app.models.operator_source_weight import OperatorSourceWeight
+from app.models.source import Source
+from app.services.routing_cache import bump_routing_version
+
+
+class RoutingConfigDiff(NamedTuple):
+    """Изменения весов, примененные при настройке маршрутизации"""
+    inserted: int
+    updated: int
+    deleted: int
+    unchanged: int
+    # source_id -> операторы, убранные из источника
+    removed_operators: dict[int, list[int]]
+
+
+def _missing_ids(db: Session, model, ids: set[int]) -> list[int]:
+    """ID из ids, которых нет в таблице модели (один запрос IN)"""
+    found = {row_id for (row_id,) in db.query(model.id).filter(model.id.in_(ids))}
+    return sorted(ids - found)
+
+
+def apply_routing_config(
+    db: Session,
+    weights_by_source: dict[int, dict[int, int]]
+) -> RoutingConfigDiff:
+    """
+    Привести веса операторов переданных источников к заданной конфигурации.
+
+    Конфигурация каждого источника полная: операторы, которых в ней нет,
+    убираются из источника; источники вне конфигурации не затрагиваются.
+    Источники и операторы проверяются одним запросом IN на таблицу, затем
+    существующие веса сравниваются с заданными и в одной транзакции выполняются
+    только нужные INSERT/UPDATE/DELETE (ID сохранившихся строк не меняются),
+    версия маршрутизации увеличивается один раз.
+
+    Args:
+        db: Сессия БД
+        weights_by_source: source_id -> {operator_id -> вес}
+
+    Returns:
+        RoutingConfigDiff: Сколько весов добавлено, изменено, удалено и не изменилось
+
+    Raises:
+        ValueError: Источник или оператор не найден (ничего не изменено)
+    """
+    missing_sources = _missing_ids(db, Source, set(weights_by_source))
+    if missing_sources:
+        raise ValueError(f"Источники с ID {missing_sources} не найдены")
+    operator_ids = {
+        operator_id for weights in weights_by_source.values() for operator_id in weights
+    }
+    missing_operators = _missing_ids(db, Operator, operator_ids)
+    if len(missing_operators) == 1:
+        raise ValueError(f"Оператор с ID {missing_operators[0]} не найден")
+    if missing_operators:
+        raise ValueError(f"Операторы с ID {missing_operators} не найдены")
+
+    existing = db.query(
+        OperatorSourceWeight.id,
+        OperatorSourceWeight.source_id,
+        OperatorSourceWeight.operator_id,
+        OperatorSourceWeight.weight,
+    ).filter(OperatorSourceWeight.source_id.in_(list(weights_by_source))).all()
+
+    to_insert = [
+        {"source_id": source_id, "operator_id": operator_id, "weight": weight}
+        for source_id, weights in weights_by_source.items()
+        for operator_id, weight in weights.items()
+    ]
+    to_update = []
+    to_delete = []
+    removed_operators: dict[int, list[int]] = {}
+    unchanged = 0
+    existing_pairs = set()
+    for row_id, source_id, operator_id, weight in existing:
+        existing_pairs.add((source_id, operator_id))
+        new_weight = weights_by_source[source_id].get(operator_id)
+        if new_weight is None:
+            to_delete.append(row_id)
+            removed_operators.setdefault(source_id, []).append(operator_id)
+        elif new_weight != weight:
+            to_update.append({"b_id": row_id, "b_weight": new_weight})
+        else:
+            unchanged += 1
+    to_insert = [
+        row for row in to_insert
+        if (row["source_id"], row["operator_id"]) not in existing_pairs
+    ]
+
+    weights_table = OperatorSourceWeight.__table__
+    if to_delete:
+        db.execute(delete(weights_table).where(weights_table.c.id.in_(to_delete)))
+    if to_update:
+        db.execute(
+            update(weights_table)
+            .where(weights_table.c.id == bindparam("b_id"))
+            .values(weight=bindparam("b_weight")),
+            to_update
+        )
+    if to_insert:
+        db.execute(insert(weights_table), to_insert)
+
+    if to_delete or to_update or to_insert:
+        bump_routing_version(db)
+    db.commit()
+
+    return RoutingConfigDiff(
+        inserted=len(to_insert),
+        updated=len(to_update),
+        deleted=len(to_delete),
+        unchanged=unchanged,
+        removed_operators=removed_operators,
+    )
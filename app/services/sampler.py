@@ -0,0 +1,87 @@
+import random
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Collection, Generic, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# Если исключенные элементы занимают больше этой доли суммы весов,
+# выборка с отклонением становится неэффективной и строится временная таблица
+REJECTION_MAX_EXCLUDED_SHARE = 0.5
+
+
+class WeightedSampler(Generic[T]):
+    """
+    Выбор элемента по весам с предвычисленными префиксными суммами.
+
+    Таблица строится один раз (O(n)), каждый выбор — бинарный поиск (O(log n)).
+    Веса целые, поэтому используется random.randrange без погрешности float.
+    """
+
+    def __init__(self, items: Sequence[T], weights: Sequence[int]):
+        self.items = tuple(items)
+        self.weights = tuple(weights)
+        self.prefix_sums = list(accumulate(self.weights))
+        self.total_weight = self.prefix_sums[-1] if self.prefix_sums else 0
+        self._weight_by_item = dict(zip(self.items, self.weights))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def draw(self, rng: random.Random = random) -> Optional[T]:
+        """
+        Выбрать элемент с вероятностью, пропорциональной весу.
+
+        Returns:
+            Optional[T]: Выбранный элемент или None, если сумма весов равна 0
+        """
+        if self.total_weight <= 0:
+            return None
+        value = rng.randrange(self.total_weight)
+        return self.items[bisect_right(self.prefix_sums, value)]
+
+    def draw_excluding(
+        self,
+        excluded: Collection[T],
+        rng: random.Random = random
+    ) -> Optional[T]:
+        """
+        Выбрать элемент по весам, пропуская исключенные.
+
+        Пока исключено немного (например, операторы, временно достигшие лимита),
+        используется выборка с отклонением по готовой таблице. Если исключенные
+        занимают большую часть веса, выбор делается по временной таблице из
+        оставшихся элементов.
+
+        Args:
+            excluded: Элементы, которые нельзя выбирать
+            rng: Генератор случайных чисел
+
+        Returns:
+            Optional[T]: Выбранный элемент или None, если выбирать не из чего
+        """
+        if not excluded:
+            return self.draw(rng)
+
+        excluded_weight = sum(self._weight_by_item.get(item, 0) for item in excluded)
+        remaining_weight = self.total_weight - excluded_weight
+        if remaining_weight <= 0:
+            return None
+
+        if excluded_weight <= self.total_weight * REJECTION_MAX_EXCLUDED_SHARE:
+            # Ожидаемое число попыток не больше 1 / (1 - доля исключенных) <= 2
+            while True:
+                item = self.draw(rng)
+                if item not in excluded:
+                    return item
+
+        remaining = [
+            (item, weight)
+            for item, weight in zip(self.items, self.weights)
+            if item not in excluded
+        ]
+        sampler = WeightedSampler(
+            [item for item, _ in remaining],
+            [weight for _, weight in remaining],
+        )
+        return sampler.draw(rng)
@@ -0,0 +1,247 @@
+import math
+from typing import NamedTuple, Optional, Sequence
+
+from app.services.distribution import HeadroomStrategy, WeightedRandomStrategy, get_strategy
+from app.services.routing_cache import SourceRoute
+
+try:
+    import numpy as np
+except ImportError:  # numpy не обязателен: нужен только симулятору
+    np = None
+
+# Стратегии с векторизованным выбором: имя -> масштабировать ли вес свободной емкостью
+VECTORIZED_STRATEGIES = {
+    WeightedRandomStrategy.name: False,
+    HeadroomStrategy.name: True,
+}
+# Время обработки обрезается сверху: mean_handling_time * HANDLING_TIME_CAP_FACTOR
+HANDLING_TIME_CAP_FACTOR = 20
+# Сколько тиков разыгрывается заранее одним вызовом генератора (ограничивает память)
+SIMULATION_BLOCK_TICKS = 4096
+
+
+class OperatorSimulationStats(NamedTuple):
+    """Итог симуляции по оператору"""
+    operator_id: int
+    weight: int
+    max_load: int
+    # Доля веса среди активных операторов маршрута
+    expected_share: float
+    # Доля назначенных обращений
+    share: float
+    # Доля времени, когда оператор был на лимите max_load
+    time_at_capacity: float
+    # Средняя нагрузка (активных обращений)
+    mean_load: float
+
+
+class SimulationResult(NamedTuple):
+    """Итог симуляции распределения"""
+    contacts: int
+    assigned: int
+    unassigned: int
+    unassigned_rate: float
+    operators: list[OperatorSimulationStats]
+
+
+def _assign_vectorized(rng, arrivals, room, weights, scale_by_headroom):
+    """
+    Распределить arrivals обращений тика векторно.
+
+    Как WeightedSampler: целые префиксные суммы весов и поиск
+    bisect_right (searchsorted side="right") по случайному целому.
+    Операторы без свободной емкости исключаются, как после неудачного
+    резерва; не поместившиеся обращения перевыбираются среди оставшихся.
+    """
+    counts = np.zeros_like(room)
+    while arrivals > 0:
+        free = room - counts
+        effective = np.where(free > 0, weights * free if scale_by_headroom else weights, 0)
+        prefix_sums = np.cumsum(effective)
+        # Нет операторов или у всех нулевой вес/нет емкости: остаток не назначен
+        total_weight = int(prefix_sums[-1]) if len(prefix_sums) else 0
+        if total_weight <= 0:
+            break
+        draws = np.searchsorted(prefix_sums, rng.integers(total_weight, size=arrivals), side="right")
+        accepted = np.minimum(np.bincount(draws, minlength=len(room)), free)
+        counts += accepted
+        arrivals -= int(accepted.sum())
+    return counts
+
+
+def _assign_by_strategy(strategy, route, arrivals, room):
+    """Распределить обращения тика по одному вызовами strategy.select (как в продакшене)"""
+    index_by_id = {operator.operator_id: index for index, operator in enumerate(route.operators)}
+    counts = np.zeros_like(room)
+    free = {
+        operator.operator_id: int(room[index])
+        for index, operator in enumerate(route.operators)
+    }
+    excluded = {operator for operator in route.operators if free[operator.operator_id] <= 0}
+    for _ in range(arrivals):
+        operator = strategy.select(route, excluded, free if strategy.uses_headroom else None)
+        if operator is None:
+            break
+        counts[index_by_id[operator.operator_id]] += 1
+        free[operator.operator_id] -= 1
+        if free[operator.operator_id] <= 0:
+            excluded.add(operator)
+    return counts
+
+
+def simulate_distribution(
+    route: SourceRoute,
+    arrival_rates: Sequence[float],
+    mean_handling_time: float,
+    duration: float,
+    handling_time_sigma: Optional[float] = None,
+    rate_interval: float = 3600.0,
+    tick: float = 1.0,
+    seed: Optional[int] = None
+) -> SimulationResult:
+    """
+    Смоделировать распределение обращений источника без записи в БД.
+
+    Время идет тиками по tick секунд. За тик приходит Poisson(rate * tick)
+    обращений (rate — элемент arrival_rates для текущего интервала по
+    rate_interval секунд, профиль повторяется по кругу), они распределяются
+    стратегией маршрута среди операторов со свободной емкостью, а время
+    обработки каждого назначенного обращения разыгрывается заранее: оператор
+    освобождается через ceil(время / tick) тиков. Обращение, для которого
+    свободных операторов нет, считается неназначенным (в сервисе оно ушло бы
+    в очередь без оператора).
+
+    Маршрут — тот же SourceRoute, что в снимке маршрутизации: активные операторы
+    и веса берутся из route.sampler. weighted_random и headroom выбирают
+    векторно по тем же целочисленным префиксным суммам, что WeightedSampler;
+    остальные стратегии (smooth_round_robin, пользовательские) вызываются по
+    одному обращению через strategy.select на новом экземпляре стратегии.
+    Состояние емкости обновляется раз в тик, поэтому tick должен быть заметно
+    меньше среднего времени обработки.
+
+    Args:
+        route: Маршрут источника (операторы с весами, max_load, is_active; стратегия)
+        arrival_rates: Интенсивность поступления (обращений в секунду) по интервалам
+        mean_handling_time: Среднее время обработки обращения (сек)
+        duration: Длительность моделирования (сек)
+        handling_time_sigma: Sigma логнормального времени обработки
+            (None — экспоненциальное распределение)
+        rate_interval: Длительность интервала arrival_rates (сек)
+        tick: Шаг моделирования (сек)
+        seed: Seed генератора случайных чисел
+
+    Returns:
+        SimulationResult: Доли операторов, время на лимите и доля неназначенных
+
+    Raises:
+        RuntimeError: Не установлен numpy
+    """
+    if np is None:
+        raise RuntimeError("Для симуляции нужен пакет numpy (pip install numpy)")
+
+    rng = np.random.default_rng(seed)
+    operators = route.operators
+    operator_count = len(operators)
+    ticks = max(1, math.ceil(duration / tick))
+
+    sampled = dict(zip(route.sampler.items, route.sampler.weights))
+    weights = np.array([sampled.get(operator, 0) for operator in operators], dtype=np.int64)
+    max_loads = np.array([operator.max_load for operator in operators], dtype=np.int64)
+
+    rates = np.asarray(arrival_rates, dtype=np.float64)
+    interval_ticks = max(1, round(rate_interval / tick))
+    tick_rates = rates[(np.arange(ticks) // interval_ticks) % len(rates)] * tick
+    arrivals_by_tick = rng.poisson(tick_rates)
+
+    if handling_time_sigma is None:
+        def draw_handling_times(size):
+            return rng.exponential(mean_handling_time, size)
+    else:
+        mu = math.log(mean_handling_time) - handling_time_sigma ** 2 / 2
+
+        def draw_handling_times(size):
+            return rng.lognormal(mu, handling_time_sigma, size)
+
+    # Кольцевой буфер освобождений: release[t % horizon, i] — сколько обращений
+    # оператора i завершится в тике t
+    horizon = math.ceil(mean_handling_time * HANDLING_TIME_CAP_FACTOR / tick) + 1
+    release = np.zeros((horizon, operator_count), dtype=np.int64)
+    load = np.zeros(operator_count, dtype=np.int64)
+    assigned_counts = np.zeros(operator_count, dtype=np.int64)
+    at_capacity_ticks = np.zeros(operator_count, dtype=np.int64)
+    load_sum = np.zeros(operator_count, dtype=np.int64)
+
+    scale_by_headroom = VECTORIZED_STRATEGIES.get(route.strategy)
+    fallback_strategy = None
+    if scale_by_headroom is None:
+        # Новый экземпляр: состояние стратегии (round-robin) не смешивается с продакшеном
+        fallback_strategy = type(get_strategy(route.strategy))()
+    prefix_sums = np.cumsum(weights)
+    total_weight = int(prefix_sums[-1]) if operator_count else 0
+    # Кандидаты по полной таблице весов можно разыграть заранее, пока никто не на лимите
+    predraw_candidates = scale_by_headroom is False and total_weight > 0
+
+    for block_start in range(0, ticks, SIMULATION_BLOCK_TICKS):
+        block_arrivals = arrivals_by_tick[block_start:block_start + SIMULATION_BLOCK_TICKS]
+        offsets = np.concatenate(([0], np.cumsum(block_arrivals))).tolist()
+        # Время обработки всех обращений блока — одним вызовом генератора
+        delays = np.ceil(draw_handling_times(offsets[-1]) / tick).astype(np.int64)
+        np.clip(delays, 1, horizon - 1, out=delays)
+        if predraw_candidates:
+            candidates = np.searchsorted(
+                prefix_sums, rng.integers(total_weight, size=offsets[-1]), side="right"
+            )
+
+        for block_index, arrivals in enumerate(block_arrivals.tolist()):
+            tick_index = block_start + block_index
+            slot = tick_index % horizon
+            load -= release[slot]
+            release[slot] = 0
+
+            if arrivals:
+                first, last = offsets[block_index], offsets[block_index + 1]
+                room = max_loads - load
+                operator_indexes = None
+                if predraw_candidates:
+                    operator_indexes = candidates[first:last]
+                    counts = np.bincount(operator_indexes, minlength=operator_count)
+                    if (counts > room).any():
+                        # Кто-то упирается в лимит: перевыбор с исключением
+                        operator_indexes = None
+                if operator_indexes is None:
+                    if fallback_strategy is None:
+                        counts = _assign_vectorized(rng, arrivals, room, weights, scale_by_headroom)
+                    else:
+                        counts = _assign_by_strategy(fallback_strategy, route, arrivals, room)
+                    operator_indexes = np.repeat(np.arange(operator_count), counts)
+                assigned = len(operator_indexes)
+                if assigned:
+                    load += counts
+                    assigned_counts += counts
+                    release_slots = (tick_index + delays[first:first + assigned]) % horizon
+                    np.add.at(release, (release_slots, operator_indexes), 1)
+
+            at_capacity_ticks += load >= max_loads
+            load_sum += load
+
+    contacts = int(arrivals_by_tick.sum())
+    assigned_total = int(assigned_counts.sum())
+    total_weight = int(weights.sum())
+    return SimulationResult(
+        contacts=contacts,
+        assigned=assigned_total,
+        unassigned=contacts - assigned_total,
+        unassigned_rate=(contacts - assigned_total) / contacts if contacts else 0.0,
+        operators=[
+            OperatorSimulationStats(
+                operator_id=operator.operator_id,
+                weight=operator.weight,
+                max_load=operator.max_load,
+                expected_share=int(weights[index]) / total_weight if total_weight else 0.0,
+                share=int(assigned_counts[index]) / assigned_total if assigned_total else 0.0,
+                time_at_capacity=int(at_capacity_ticks[index]) / ticks,
+                mean_load=int(load_sum[index]) / ticks,
+            )
+            for index, operator in enumerate(operators)
+        ],
+    )
@@ -0,0 +1,118 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.source import Source
+from app.services.contact_lifecycle import complete_contacts
+
+logger = logging.getLogger(__name__)
+
+
+def sweep_expired_contacts(
+    db: Session,
+    chunk_size: int,
+    now: Optional[datetime] = None,
+    stop_event: Optional[threading.Event] = None
+) -> int:
+    """
+    Завершить активные обращения, пережившие TTL своего источника.
+
+    Для каждого источника с contact_ttl_seconds обращения завершаются порциями
+    по chunk_size самых старых (диапазон по индексу (status, created_at)),
+    каждая порция — отдельной короткой транзакцией: запись в SQLite не
+    блокируется надолго, распределение новых обращений идет между порциями.
+
+    Args:
+        db: Сессия БД
+        chunk_size: Сколько обращений завершать одной транзакцией
+        now: Текущий момент (UTC), по умолчанию — системное время
+        stop_event: Прервать проверку между порциями, если событие установлено
+
+    Returns:
+        int: Сколько обращений завершено
+    """
+    now = now or datetime.now(timezone.utc)
+    sources = db.query(Source.id, Source.contact_ttl_seconds).filter(
+        Source.contact_ttl_seconds.is_not(None)
+    ).all()
+    db.commit()
+
+    completed = 0
+    for source_id, ttl_seconds in sources:
+        cutoff = now - timedelta(seconds=ttl_seconds)
+        while not (stop_event and stop_event.is_set()):
+            result = complete_contacts(
+                db, source_id=source_id, older_than=cutoff, limit=chunk_size
+            )
+            completed += result.completed
+            if result.completed < chunk_size:
+                break
+    return completed
+
+
+class ContactTTLSweeper:
+    """
+    Фоновая проверка TTL активных обращений.
+
+    Поток раз в interval секунд завершает просроченные обращения
+    (sweep_expired_contacts), освобождая емкость операторов, которые
+    не закрыли брошенные диалоги.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        interval: float,
+        chunk_size: int
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.chunk_size = max(1, chunk_size)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """Запущен ли поток проверки"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Запустить поток проверки (interval <= 0 — проверка отключена)"""
+        if self.running or self.interval <= 0:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="contact-ttl-sweeper", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Остановить поток проверки (текущая порция дописывается)"""
+        if not self.running:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                with self.session_factory() as db:
+                    completed = sweep_expired_contacts(
+                        db, self.chunk_size, stop_event=self._stop_event
+                    )
+                if completed:
+                    logger.info("Завершено %d обращений по TTL источников", completed)
+            except Exception:
+                logger.exception("Ошибка при проверке TTL обращений")
+
+
+contact_ttl_sweeper = ContactTTLSweeper(
+    session_factory=SessionLocal,
+    interval=settings.contact_ttl_sweep_interval,
+    chunk_size=settings.contact_ttl_sweep_chunk,
+)
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, NamedTuple, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.contact import Contact
+from app.services.distribution import distribute_contacts_batch
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingContact(NamedTuple):
+    """Обращение, ожидающее фиксации"""
+    external_id: str
+    source_code: str
+    future: Future
+
+
+_STOP = object()
+
+
+class ContactWriterStopped(RuntimeError):
+    """Поток-писатель остановлен: обращение не принято или не зафиксировано"""
+
+
+class ContactWriteCoalescer:
+    """
+    Групповая фиксация обращений (group commit).
+    
+    Запросы ставят обращения в очередь, единственный поток-писатель забирает
+    их пачками (до max_batch_size штук или по истечении max_linger_ms после
+    первого обращения пачки) и распределяет пачку одной транзакцией через
+    distribute_contacts_batch — один commit (fsync) на пачку вместо одного
+    на запрос. Лимиты max_load соблюдаются и внутри пачки.
+    Каждый запрос получает свой Contact (или ошибку) через Future.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_batch_size: int,
+        max_linger_ms: float,
+        result_timeout: float
+    ):
+        self.session_factory = session_factory
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_linger = max(0.0, max_linger_ms) / 1000
+        self.result_timeout = result_timeout
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        # Прием обращений закрыт (stop); под _lock, чтобы после _STOP
+        # в очередь ничего не попадало
+        self._stopped = True
+        self._lock = threading.Lock()
+    
+    @property
+    def running(self) -> bool:
+        """Запущен ли поток-писатель"""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self) -> None:
+        """Запустить поток-писатель"""
+        if self.running:
+            return
+        with self._lock:
+            self._stopped = False
+        self._thread = threading.Thread(
+            target=self._run, name="contact-writer", daemon=True
+        )
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """
+        Зафиксировать принятые обращения и остановить поток-писатель.
+        
+        Новые обращения после вызова не принимаются (ContactWriterStopped).
+        """
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(_STOP)
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+    
+    def submit(self, external_id: str, source_code: str) -> "Future[Contact]":
+        """
+        Поставить обращение в очередь на распределение.
+        
+        Returns:
+            Future[Contact]: Созданное обращение (отсоединено от сессии)
+                или ValueError для неизвестного источника
+        
+        Raises:
+            ContactWriterStopped: Поток-писатель остановлен
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._stopped:
+                raise ContactWriterStopped("Групповая фиксация обращений остановлена")
+            self._queue.put(_PendingContact(external_id, source_code, future))
+        return future
+    
+    def write(self, external_id: str, source_code: str) -> Contact:
+        """
+        Поставить обращение в очередь и дождаться фиксации его пачки.
+        
+        В асинхронном режиме (код эндпоинта выполняется в AsyncSession.run_sync)
+        ожидание идет через event loop и не блокирует его. Ожидание ограничено
+        result_timeout: по его истечении обращение еще может быть зафиксировано
+        писателем, но запрос получает ошибку.
+        
+        Returns:
+            Contact: Созданное обращение (отсоединено от сессии)
+        
+        Raises:
+            ValueError: Источник не найден
+            ContactWriterStopped: Поток-писатель остановлен
+            TimeoutError: Пачка не зафиксирована за result_timeout секунд
+        """
+        future = self.submit(external_id, source_code)
+        if in_greenlet():
+            return await_only(asyncio.wait_for(asyncio.wrap_future(future), self.result_timeout))
+        return future.result(timeout=self.result_timeout)
+    
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_linger
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+        
+        # После _STOP обращений быть не должно (submit закрыт), но ни одно
+        # ожидание не должно остаться без ответа
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item.future.set_exception(
+                    ContactWriterStopped("Групповая фиксация обращений остановлена")
+                )
+    
+    def _write(self, batch: list[_PendingContact]) -> None:
+        try:
+            with self.session_factory() as db:
+                results = distribute_contacts_batch(
+                    db, [(item.external_id, item.source_code) for item in batch]
+                )
+        except Exception as e:
+            logger.exception("Не удалось зафиксировать пачку из %d обращений", len(batch))
+            for item in batch:
+                item.future.set_exception(e)
+            return
+        
+        for item, result in zip(batch, results):
+            if isinstance(result, Exception):
+                item.future.set_exception(result)
+            else:
+                item.future.set_result(result)
+
+
+contact_write_coalescer = ContactWriteCoalescer(
+    session_factory=SessionLocal,
+    max_batch_size=settings.contact_writer_max_batch,
+    max_linger_ms=settings.contact_writer_max_linger_ms,
+    result_timeout=settings.contact_writer_result_timeout,
+)
@@ -0,0 +1 @@
+"""Бенчмарки производительности мини-CRM (запуск: python -m benchmarks.<модуль>)"""
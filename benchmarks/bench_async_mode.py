@@ -0,0 +1,110 @@
+"""
+Бенчмарк API в синхронном и асинхронном (CRM_DB_ASYNC, aiosqlite) режимах.
+
+Режим БД выбирается при импорте приложения, поэтому каждый режим
+запускается в отдельном процессе на копии одной и той же заранее
+заполненной БД. Запросы отправляются пачками параллельных корутин через
+httpx.ASGITransport (без сети): половина — POST /api/contacts,
+половина — GET /api/operators/{id}.
+
+Запуск:
+    python -m benchmarks.bench_async_mode --requests 2000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = {"sync": "0", "async": "1"}
+
+
+def prepare_database(path: str, operators: int, contacts: int) -> None:
+    """Создать и заполнить эталонную БД (общую для всех режимов)"""
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base, create_db_engine
+    from benchmarks.bench_sqlite_profile import seed
+
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    seed(sessionmaker(autocommit=False, autoflush=False, bind=engine), operators, contacts)
+    engine.dispose()
+
+
+async def run_requests(args) -> dict:
+    """Отправить запросы к приложению текущего процесса и замерить время"""
+    import httpx
+
+    from app.main import app, lifespan
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            semaphore = asyncio.Semaphore(args.concurrency)
+            statuses: dict[int, int] = {}
+
+            async def one(sequence: int) -> None:
+                async with semaphore:
+                    if sequence % 2:
+                        response = await client.get(f"/api/operators/{1 + sequence % args.operators}")
+                    else:
+                        response = await client.post("/api/contacts", json={
+                            "external_id": f"bench_{sequence % 1000}",
+                            "source_code": "bench",
+                        })
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(sequence) for sequence in range(args.requests)))
+            elapsed = time.perf_counter() - started
+
+    return {
+        "requests_per_sec": round(args.requests / elapsed, 1),
+        "statuses": statuses,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100, help="Одновременных запросов")
+    parser.add_argument("--operators", type=int, default=50)
+    parser.add_argument("--contacts", type=int, default=2000, help="Обращений для начального заполнения")
+    parser.add_argument("--json", action="store_true", help="Вывести результат в JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_requests(args))))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        template = os.path.join(tmp_dir, "template.db")
+        prepare_database(template, args.operators, args.contacts)
+        for mode, flag in MODES.items():
+            path = os.path.join(tmp_dir, f"{mode}.db")
+            shutil.copyfile(template, path)
+            env = {**os.environ, "CRM_DATABASE_URL": f"sqlite:///{path}", "CRM_DB_ASYNC": flag}
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_async_mode", "--child", *sys.argv[1:]],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            results.append({"mode": mode, **json.loads(output.splitlines()[-1])})
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'режим':>6} {'запросов/с':>11}  статусы")
+    for result in results:
+        print(f"{result['mode']:>6} {result['requests_per_sec']:>11}  {result['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Нагрузочный бенчмарк горячего пути распределения обращений.
+
+Временная БД заполняется операторами, источниками, весами и существующими
+обращениями, после чего обращения создаются с заданной конкурентностью:
+- api — POST /api/contacts через httpx.ASGITransport (приложение в процессе,
+  без сети), конкурентность — число одновременных корутин;
+- service — distribute_contact напрямую, конкурентность — число потоков,
+  у каждого потока своя сессия.
+
+Каждый драйвер запускается в отдельном процессе на копии одной и той же
+заполненной БД (приложение привязывается к БД при импорте). Фоновые потоки
+(TTL, очередь без оператора) в замерах отключены. Для каждого драйвера
+считаются пропускная способность, задержки p50/p95/p99 и число SQL-запросов
+на обращение (события before_cursor_execute engine приложения).
+
+Результат — JSON (параметры, коммит git, результаты драйверов), пригодный
+для сравнения между коммитами:
+
+    python -m benchmarks.bench_distribution --requests 5000 --concurrency 16 --output before.json
+    git checkout ... && python -m benchmarks.bench_distribution ... --output after.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DRIVERS = ("api", "service")
+SEED_BATCH_SIZE = 1000
+
+
+def seed_routing(session_factory, args) -> None:
+    """
+    Заполнить БД: операторы, источники bench_0..N-1 со случайными весами
+    operators_per_source операторов и существующие обращения (пакетами).
+    """
+    from app.models.operator import Operator
+    from app.models.operator_source_weight import OperatorSourceWeight
+    from app.models.source import Source
+    from app.services.distribution import distribute_contacts_batch
+    from app.services.routing_cache import routing_cache
+
+    rng = random.Random(args.seed)
+    with session_factory() as db:
+        db.add_all([
+            Operator(name=f"Оператор {i}", max_load=args.max_load)
+            for i in range(args.operators)
+        ])
+        db.add_all([
+            Source(name=f"Бенчмарк {i}", code=f"bench_{i}") for i in range(args.sources)
+        ])
+        db.flush()
+        per_source = min(args.operators_per_source, args.operators)
+        db.add_all([
+            OperatorSourceWeight(operator_id=operator_id, source_id=source_id, weight=rng.randint(1, 10))
+            for source_id in range(1, args.sources + 1)
+            for operator_id in rng.sample(range(1, args.operators + 1), per_source)
+        ])
+        db.commit()
+        routing_cache.refresh(db)
+
+    items = [
+        (f"seed_{i % max(1, args.leads)}", f"bench_{i % args.sources}")
+        for i in range(args.contacts)
+    ]
+    for start in range(0, len(items), SEED_BATCH_SIZE):
+        with session_factory() as db:
+            distribute_contacts_batch(db, items[start:start + SEED_BATCH_SIZE])
+
+
+def prepare_database(path: str, args) -> None:
+    """Создать и заполнить эталонную БД (общую для всех драйверов)"""
+    from sqlalchemy.orm import sessionmaker
+
+    import app.models  # noqa: F401 — регистрирует таблицы в Base.metadata
+    from app.database import Base, create_db_engine
+
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    seed_routing(sessionmaker(autocommit=False, autoflush=False, bind=engine), args)
+    engine.dispose()
+
+
+def request_items(args) -> list[tuple[str, str]]:
+    """Обращения замера: часть лидов уже есть в БД (повторные обращения)"""
+    rng = random.Random(args.seed + 1)
+    return [
+        (
+            f"seed_{rng.randrange(max(1, args.leads))}"
+            if rng.random() < args.repeat_share else f"new_{sequence}",
+            f"bench_{rng.randrange(args.sources)}",
+        )
+        for sequence in range(args.requests)
+    ]
+
+
+def install_query_counter() -> list[int]:
+    """Считать SQL-запросы всех engine приложения"""
+    from sqlalchemy import event
+
+    from app import database
+
+    counter = [0]
+    lock = threading.Lock()
+
+    def count(*_) -> None:
+        with lock:
+            counter[0] += 1
+
+    engines = {database.engine, database.read_engine}
+    engines |= {
+        async_engine.sync_engine
+        for async_engine in (database.async_engine, database.async_read_engine)
+        if async_engine is not None
+    }
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", count)
+    return counter
+
+
+async def drive_api(items, concurrency: int) -> tuple[list[float], dict[str, int]]:
+    """Создать обращения через POST /api/contacts"""
+    import httpx
+
+    from app.main import app, lifespan
+
+    latencies = []
+    outcomes: dict[str, int] = {}
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one(external_id: str, source_code: str) -> None:
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post("/api/contacts", json={
+                        "external_id": external_id,
+                        "source_code": source_code,
+                    })
+                    latencies.append(time.perf_counter() - started)
+                key = str(response.status_code)
+                outcomes[key] = outcomes.get(key, 0) + 1
+
+            await asyncio.gather(*(one(*item) for item in items))
+    return latencies, outcomes
+
+
+def drive_service(items, concurrency: int) -> tuple[list[float], dict[str, int]]:
+    """Создать обращения вызовами distribute_contact из пула потоков"""
+    from app.database import SessionLocal
+    from app.services.distribution import distribute_contact
+    from app.services.routing_cache import routing_cache
+
+    with SessionLocal() as db:
+        routing_cache.refresh(db)
+
+    latencies = []
+    outcomes: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def one(item) -> None:
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            try:
+                distribute_contact(db, *item)
+                key = "ok"
+            except Exception as e:
+                db.rollback()
+                key = type(e).__name__
+            elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            outcomes[key] = outcomes.get(key, 0) + 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, items))
+    return latencies, outcomes
+
+
+def summarize(latencies: list[float], elapsed: float, queries: int) -> dict:
+    """Пропускная способность, перцентили задержки (мс) и запросы на обращение"""
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3),
+            "p50": round(percentiles[49] * 1000, 3),
+            "p95": round(percentiles[94] * 1000, 3),
+            "p99": round(percentiles[98] * 1000, 3),
+            "max": round(max(latencies) * 1000, 3),
+        },
+        "queries_per_request": round(queries / len(latencies), 2),
+    }
+
+
+def run_driver(args) -> dict:
+    """Прогнать драйвер в текущем процессе (БД задана через CRM_DATABASE_URL)"""
+    counter = install_query_counter()
+    items = request_items(args)
+
+    started = time.perf_counter()
+    if args.driver == "api":
+        latencies, outcomes = asyncio.run(drive_api(items, args.concurrency))
+    else:
+        latencies, outcomes = drive_service(items, args.concurrency)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "driver": args.driver,
+        **summarize(latencies, elapsed, counter[0]),
+        "outcomes": outcomes,
+    }
+
+
+def git_commit() -> str | None:
+    """Текущий коммит репозитория (None вне git)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000, help="Обращений на драйвер")
+    parser.add_argument("--concurrency", type=int, default=8, help="Одновременных запросов/потоков")
+    parser.add_argument("--drivers", default=",".join(DRIVERS), help="Драйверы через запятую")
+    parser.add_argument("--operators", type=int, default=50)
+    parser.add_argument("--sources", type=int, default=30)
+    parser.add_argument("--operators-per-source", type=int, default=10)
+    parser.add_argument("--max-load", type=int, default=10**9, help="Лимит нагрузки операторов")
+    parser.add_argument("--contacts", type=int, default=10000, help="Обращений для начального заполнения")
+    parser.add_argument("--leads", type=int, default=5000, help="Лидов среди начальных обращений")
+    parser.add_argument(
+        "--repeat-share", type=float, default=0.5,
+        help="Доля обращений замера от уже существующих лидов"
+    )
+    parser.add_argument("--db-async", action="store_true", help="Режим CRM_DB_ASYNC для драйвера api")
+    parser.add_argument("--seed", type=int, default=42, help="Seed генератора случайных чисел")
+    parser.add_argument("--output", help="Записать JSON в файл (по умолчанию — stdout)")
+    parser.add_argument("--driver", choices=DRIVERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.driver:
+        print(json.dumps(run_driver(args)))
+        return
+
+    drivers = [name.strip() for name in args.drivers.split(",") if name.strip()]
+    unknown = set(drivers) - set(DRIVERS)
+    if unknown:
+        parser.error(f"неизвестные драйверы: {', '.join(sorted(unknown))}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        template = os.path.join(tmp_dir, "template.db")
+        prepare_database(template, args)
+        for driver in drivers:
+            path = os.path.join(tmp_dir, f"{driver}.db")
+            shutil.copyfile(template, path)
+            env = {
+                **os.environ,
+                "CRM_DATABASE_URL": f"sqlite:///{path}",
+                "CRM_DB_ASYNC": "1" if args.db_async else "0",
+                "CRM_CONTACT_TTL_SWEEP_INTERVAL": "0",
+                "CRM_BACKLOG_DISPATCH_INTERVAL": "0",
+            }
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_distribution", *sys.argv[1:], "--driver", driver],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            results.append(json.loads(output.splitlines()[-1]))
+
+    params = {
+        key: value for key, value in vars(args).items()
+        if key not in {"driver", "drivers", "output"}
+    }
+    report = json.dumps(
+        {"commit": git_commit(), "params": params, "results": results},
+        ensure_ascii=False, indent=2,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
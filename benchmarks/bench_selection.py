@@ -0,0 +1,62 @@
+"""
+Микробенчмарк выбора оператора по весам.
+
+Сравнивает select_operator_by_weights (линейный проход с пересчетом сумм
+на каждый вызов) с WeightedSampler (предвычисленные префиксные суммы + bisect),
+в том числе выбор с исключением операторов, достигших лимита.
+
+Запуск:
+    python -m benchmarks.bench_selection
+"""
+
+import random
+import timeit
+from typing import NamedTuple
+
+from app.services.distribution import select_operator_by_weights
+from app.services.sampler import WeightedSampler
+
+POOL_SIZES = (10, 100, 1000)
+DRAWS = 20_000
+
+
+class FakeOperator(NamedTuple):
+    id: int
+
+
+def run_benchmark(pool_size: int, draws: int = DRAWS) -> dict[str, float]:
+    """Замерить среднее время одного выбора (мкс) для пула операторов"""
+    rng = random.Random(pool_size)
+    operators = [FakeOperator(i) for i in range(pool_size)]
+    weights = [rng.randint(1, 100) for _ in range(pool_size)]
+    pairs = list(zip(operators, weights))
+
+    sampler = WeightedSampler(operators, weights)
+    # Около 10% пула временно на лимите
+    saturated = set(rng.sample(operators, max(1, pool_size // 10)))
+
+    timings = {
+        "linear": timeit.timeit(lambda: select_operator_by_weights(pairs), number=draws),
+        "sampler": timeit.timeit(sampler.draw, number=draws),
+        "sampler_excluding": timeit.timeit(
+            lambda: sampler.draw_excluding(saturated), number=draws
+        ),
+        "sampler_build": timeit.timeit(
+            lambda: WeightedSampler(operators, weights), number=max(1, draws // 100)
+        ) * 100,
+    }
+    return {name: seconds / draws * 1e6 for name, seconds in timings.items()}
+
+
+def main() -> None:
+    print(f"{'операторов':>10} {'linear':>10} {'sampler':>10} {'excluding':>10} {'build':>10}  (мкс)")
+    for pool_size in POOL_SIZES:
+        result = run_benchmark(pool_size)
+        print(
+            f"{pool_size:>10} {result['linear']:>10.2f} {result['sampler']:>10.2f} "
+            f"{result['sampler_excluding']:>10.2f} {result['sampler_build']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Бенчмарк сериализации списка обращений: ORM + response_model vs быстрый путь.
+
+Для 100/1000/10000 строк сравниваются:
+- orm — ORM-объекты Contact, валидация List[ContactResponse] через
+  from_attributes и сериализация в JSON pydantic (как для response_model);
+- columns — кортежи колонок, словари и FastJSONResponse (orjson, если
+  установлен, иначе pydantic-core), как в быстром пути GET /api/contacts;
+- columns_stdlib — те же словари, но через json.dumps стандартной библиотеки.
+
+Замеряются медианное время (мс, включая запрос к БД) и пик выделенной
+памяти (tracemalloc, КиБ).
+
+Запуск:
+    python -m benchmarks.bench_serialization --repeat 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import sessionmaker
+
+from app.api.contacts import CONTACT_COLUMNS, CONTACT_FIELDS
+from app.api.responses import FastJSONResponse, rows_to_dicts
+from app.database import Base, create_db_engine
+from app.main import app  # noqa: F401 — разрешает forward references схем
+from app.models.contact import Contact
+from app.schemas.contact import CONTACT_EXPANSIONS, ContactResponse
+from benchmarks.bench_sqlite_profile import seed
+
+ROW_COUNTS = (100, 1000, 10000)
+
+
+def serialize_orm(db, limit: int) -> bytes:
+    adapter = TypeAdapter(List[ContactResponse])
+    contacts = db.query(Contact).order_by(Contact.id).limit(limit).all()
+    return adapter.dump_json(adapter.validate_python(contacts, from_attributes=True))
+
+
+def serialize_columns(db, limit: int) -> bytes:
+    rows = db.query(*CONTACT_COLUMNS).order_by(Contact.id).limit(limit).all()
+    return FastJSONResponse(
+        rows_to_dicts(rows, CONTACT_FIELDS, **dict.fromkeys(CONTACT_EXPANSIONS))
+    ).body
+
+
+def serialize_columns_stdlib(db, limit: int) -> bytes:
+    rows = db.query(*CONTACT_COLUMNS).order_by(Contact.id).limit(limit).all()
+    items = rows_to_dicts(rows, CONTACT_FIELDS, **dict.fromkeys(CONTACT_EXPANSIONS))
+    return json.dumps(items, default=str, ensure_ascii=False).encode()
+
+
+VARIANTS = {
+    "orm": serialize_orm,
+    "columns": serialize_columns,
+    "columns_stdlib": serialize_columns_stdlib,
+}
+
+
+def measure(session_factory, variant, limit: int, repeat: int) -> dict:
+    """Медианное время и пик памяти одного ответа"""
+    timings = []
+    for _ in range(repeat):
+        with session_factory() as db:
+            started = time.perf_counter()
+            variant(db, limit)
+            timings.append(time.perf_counter() - started)
+
+    with session_factory() as db:
+        tracemalloc.start()
+        variant(db, limit)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов на вариант")
+    parser.add_argument("--json", action="store_true", help="Вывести результат в JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        seed(session_factory, operators=20, contacts=max(ROW_COUNTS))
+
+        for limit in ROW_COUNTS:
+            for name, variant in VARIANTS.items():
+                results.append({
+                    "rows": limit,
+                    "variant": name,
+                    **measure(session_factory, variant, limit, args.repeat),
+                })
+        engine.dispose()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'строк':>6} {'вариант':>15} {'мс':>9} {'пик КиБ':>9}")
+    for result in results:
+        print(
+            f"{result['rows']:>6} {result['variant']:>15} "
+            f"{result['median_ms']:>9} {result['peak_kib']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
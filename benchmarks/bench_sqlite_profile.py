@@ -0,0 +1,164 @@
+"""
+Бенчмарк конкурентного чтения и записи SQLite: исходный engine vs профиль.
+
+Для каждого профиля создается временная БД, заполняется операторами,
+источником и обращениями, после чего в течение заданного времени
+параллельно работают:
+- писатели — distribute_contact (резерв нагрузки + вставка обращения + commit);
+- читатели — выборки обращений оператора и подсчет нагрузки.
+
+"baseline" — engine как до профиля (журнал rollback, synchronous=FULL,
+пул по умолчанию), "tuned" — настройки из app.config (WAL, synchronous=NORMAL,
+busy_timeout, cache_size/mmap_size, temp_store=MEMORY, размер пула).
+
+Запуск:
+    python -m benchmarks.bench_sqlite_profile --duration 5 --writers 4 --readers 8
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import replace
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base, create_db_engine
+from app.models.contact import Contact, ContactStatus
+from app.models.operator import Operator
+from app.models.operator_source_weight import OperatorSourceWeight
+from app.models.source import Source
+from app.services.distribution import distribute_contact
+from app.services.lead_service import lead_id_cache
+from app.services.routing_cache import routing_cache
+
+BASELINE = replace(
+    settings,
+    sqlite_journal_mode=None,
+    sqlite_synchronous=None,
+    sqlite_busy_timeout_ms=None,
+    sqlite_cache_size=None,
+    sqlite_mmap_size=None,
+    sqlite_temp_store=None,
+    db_pool_size=5,
+    db_max_overflow=10,
+)
+PROFILES = {"baseline": BASELINE, "tuned": settings}
+
+
+def seed(session_factory, operators: int, contacts: int) -> None:
+    """Заполнить БД: операторы с большим лимитом, один источник, обращения
+
+    Снимок маршрутизации перестраивается по новой БД.
+    """
+    with session_factory() as db:
+        db.add_all([
+            Operator(name=f"Оператор {i}", max_load=10**9) for i in range(operators)
+        ])
+        db.add(Source(name="Бенчмарк", code="bench"))
+        db.flush()
+        db.add_all([
+            OperatorSourceWeight(operator_id=i + 1, source_id=1, weight=1 + i % 5)
+            for i in range(operators)
+        ])
+        db.commit()
+        routing_cache.refresh(db)
+    with session_factory() as db:
+        for external_id in range(contacts):
+            distribute_contact(db, f"seed_{external_id}", "bench")
+
+
+def run_profile(name: str, config, args) -> dict:
+    """Прогнать нагрузку для профиля и вернуть пропускную способность"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+        engine = create_db_engine(url, config)
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        lead_id_cache.clear()
+        seed(session_factory, args.operators, args.contacts)
+
+        counters = {"writes": 0, "reads": 0, "errors": 0}
+        lock = threading.Lock()
+        stop_at = time.monotonic() + args.duration
+
+        def count(key: str) -> None:
+            with lock:
+                counters[key] += 1
+
+        def writer(worker: int) -> None:
+            sequence = 0
+            while time.monotonic() < stop_at:
+                sequence += 1
+                with session_factory() as db:
+                    try:
+                        distribute_contact(db, f"w{worker}_{sequence % 1000}", "bench")
+                        count("writes")
+                    except Exception:
+                        db.rollback()
+                        count("errors")
+
+        def reader(worker: int) -> None:
+            sequence = 0
+            while time.monotonic() < stop_at:
+                sequence += 1
+                operator_id = 1 + (worker + sequence) % args.operators
+                with session_factory() as db:
+                    try:
+                        db.query(Contact).filter(Contact.operator_id == operator_id) \
+                            .order_by(Contact.id.desc()).limit(100).all()
+                        db.query(func.count(Contact.id)).filter(
+                            Contact.operator_id == operator_id,
+                            Contact.status == ContactStatus.ACTIVE.value
+                        ).scalar()
+                        count("reads")
+                    except Exception:
+                        db.rollback()
+                        count("errors")
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+        threads += [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    return {
+        "profile": name,
+        "writes_per_sec": round(counters["writes"] / args.duration, 1),
+        "reads_per_sec": round(counters["reads"] / args.duration, 1),
+        "errors": counters["errors"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=5.0, help="Секунд на профиль")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--operators", type=int, default=50)
+    parser.add_argument("--contacts", type=int, default=2000, help="Обращений для начального заполнения")
+    parser.add_argument("--json", action="store_true", help="Вывести результат в JSON")
+    args = parser.parse_args()
+
+    results = [run_profile(name, config, args) for name, config in PROFILES.items()]
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'профиль':>10} {'запись/с':>10} {'чтение/с':>10} {'ошибки':>8}")
+    for result in results:
+        print(
+            f"{result['profile']:>10} {result['writes_per_sec']:>10} "
+            f"{result['reads_per_sec']:>10} {result['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
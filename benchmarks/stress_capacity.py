@@ -0,0 +1,246 @@
+"""
+Стресс-проверка резерва емкости операторов при конкурентном распределении.
+
+Несколько процессов, в каждом несколько потоков, вызывают distribute_contact
+на одном файле SQLite. После каждого прогона проверяются инварианты:
+- ни у одного оператора активных обращений не больше max_load;
+- счетчик active_load совпадает с фактическим числом активных обращений;
+- saturation (спрос вдвое больше суммарной емкости): емкость заполнена целиком;
+- shares (лимиты не ограничивают): доли операторов совпадают с долями весов
+  с точностью --tolerance;
+- ни одно обращение не потеряно: любой исход, кроме успешного создания
+  (например, OperationalError "database is locked"), — нарушение.
+
+Каждый сценарий прогоняется с отложенными транзакциями (deferred, как по
+умолчанию) и с BEGIN IMMEDIATE (CRM_SQLITE_BEGIN_IMMEDIATE), для обоих
+замеряется пропускная способность и ошибки. При нарушении инварианта
+скрипт завершается с кодом 1.
+
+Запуск:
+    python -m benchmarks.stress_capacity --processes 4 --threads 4 --contacts 4000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from multiprocessing import get_context
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 — регистрирует таблицы в Base.metadata
+from app.config import settings
+from app.database import Base, create_db_engine
+from app.models.contact import Contact, ContactStatus
+from app.models.operator import Operator
+from app.models.operator_source_weight import OperatorSourceWeight
+from app.models.source import Source
+from app.services.distribution import distribute_contact
+from app.services.lead_service import lead_id_cache
+from app.services.routing_cache import routing_cache
+
+MODES = {"deferred": False, "immediate": True}
+SCENARIOS = ("saturation", "shares")
+UNLIMITED_LOAD = 10**9
+
+
+def operator_weight(index: int) -> int:
+    """Вес оператора в источнике стресс-теста: 1, 2, 3, 4, 1, 2, ..."""
+    return 1 + index % 4
+
+
+def seed(url: str, scenario: str, args) -> None:
+    """Создать БД: операторы с весами в одном источнике stress"""
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    max_load = args.max_load if scenario == "saturation" else UNLIMITED_LOAD
+    with sessionmaker(bind=engine)() as db:
+        db.add_all([
+            Operator(name=f"Оператор {i}", max_load=max_load) for i in range(args.operators)
+        ])
+        db.add(Source(name="Стресс", code="stress"))
+        db.flush()
+        db.add_all([
+            OperatorSourceWeight(operator_id=i + 1, source_id=1, weight=operator_weight(i))
+            for i in range(args.operators)
+        ])
+        db.commit()
+    engine.dispose()
+
+
+def worker(url: str, begin_immediate: bool, process_index: int, contacts: int, threads: int) -> dict:
+    """
+    Распределить contacts обращений из threads потоков одного процесса.
+
+    Returns:
+        dict: Исходы по типам ("ok" или имя исключения) и время работы потоков (с)
+    """
+    config = replace(settings, sqlite_begin_immediate=begin_immediate)
+    engine = create_db_engine(url, config)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    lead_id_cache.clear()
+    try:
+        with session_factory() as db:
+            routing_cache.refresh(db)
+    except Exception as e:
+        # Процесс не смог начать: все его обращения считаются потерянными
+        engine.dispose()
+        return {"outcomes": {f"{type(e).__name__} (старт процесса)": contacts}, "elapsed": 0.0}
+
+    outcomes: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def run_thread(thread_index: int) -> None:
+        for sequence in range(thread_index, contacts, threads):
+            with session_factory() as db:
+                try:
+                    distribute_contact(db, f"p{process_index}_{sequence}", "stress")
+                    key = "ok"
+                except Exception as e:
+                    db.rollback()
+                    key = type(e).__name__
+            with lock:
+                outcomes[key] = outcomes.get(key, 0) + 1
+
+    pool = [threading.Thread(target=run_thread, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return {"outcomes": outcomes, "elapsed": elapsed}
+
+
+def check_invariants(url: str, scenario: str, args) -> list[str]:
+    """Проверить нагрузку операторов после прогона; вернуть найденные нарушения"""
+    engine = create_db_engine(url)
+    with sessionmaker(bind=engine)() as db:
+        actual = dict(
+            db.query(Contact.operator_id, func.count(Contact.id))
+            .filter(
+                Contact.operator_id.is_not(None),
+                Contact.status == ContactStatus.ACTIVE.value,
+            )
+            .group_by(Contact.operator_id)
+            .all()
+        )
+        operators = db.query(Operator.id, Operator.active_load, Operator.max_load) \
+            .order_by(Operator.id).all()
+        total = db.query(func.count(Contact.id)).scalar()
+    engine.dispose()
+
+    violations = []
+    for operator_id, active_load, max_load in operators:
+        count = actual.get(operator_id, 0)
+        if count > max_load:
+            violations.append(f"оператор {operator_id}: {count} активных при max_load={max_load}")
+        if active_load != count:
+            violations.append(f"оператор {operator_id}: active_load={active_load}, фактически {count}")
+
+    assigned = sum(actual.values())
+    if scenario == "saturation":
+        capacity = sum(max_load for _, _, max_load in operators)
+        if total >= capacity and assigned != capacity:
+            violations.append(f"назначено {assigned} при суммарной емкости {capacity}")
+    elif assigned:
+        total_weight = sum(operator_weight(i) for i in range(len(operators)))
+        for index, (operator_id, _, _) in enumerate(operators):
+            expected = operator_weight(index) / total_weight
+            observed = actual.get(operator_id, 0) / assigned
+            if abs(observed - expected) > args.tolerance:
+                violations.append(
+                    f"оператор {operator_id}: доля {observed:.3f} при ожидаемой {expected:.3f}"
+                )
+    return violations
+
+
+def run(scenario: str, mode: str, args) -> dict:
+    """Прогнать сценарий в режиме транзакций и проверить инварианты"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = f"sqlite:///{os.path.join(tmp_dir, 'stress.db')}"
+        seed(url, scenario, args)
+
+        per_process = [
+            args.contacts // args.processes + (index < args.contacts % args.processes)
+            for index in range(args.processes)
+        ]
+        with ProcessPoolExecutor(args.processes, mp_context=get_context("spawn")) as pool:
+            reports = list(pool.map(
+                worker,
+                [url] * args.processes,
+                [MODES[mode]] * args.processes,
+                range(args.processes),
+                per_process,
+                [args.threads] * args.processes,
+            ))
+        violations = check_invariants(url, scenario, args)
+
+    outcomes: dict[str, int] = {}
+    for report in reports:
+        for key, count in report["outcomes"].items():
+            outcomes[key] = outcomes.get(key, 0) + count
+    elapsed = max(report["elapsed"] for report in reports) or float("inf")
+    for key, count in sorted(outcomes.items()):
+        if key != "ok":
+            violations.append(f"{count} обращений не создано: {key}")
+    return {
+        "scenario": scenario,
+        "mode": mode,
+        "contacts_per_sec": round(outcomes.get("ok", 0) / elapsed, 1),
+        "outcomes": outcomes,
+        "violations": violations,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4, help="Потоков в каждом процессе")
+    parser.add_argument("--contacts", type=int, default=4000, help="Обращений на прогон")
+    parser.add_argument("--operators", type=int, default=8)
+    parser.add_argument(
+        "--max-load", type=int, default=None,
+        help="Лимит операторов в сценарии saturation (по умолчанию — половина спроса)"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.03, help="Допуск доли оператора")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Сценарии через запятую")
+    parser.add_argument("--modes", default=",".join(MODES), help="Режимы транзакций через запятую")
+    parser.add_argument("--json", action="store_true", help="Вывести результат в JSON")
+    args = parser.parse_args()
+    if args.max_load is None:
+        args.max_load = max(1, args.contacts // (2 * args.operators))
+
+    scenarios = [name for name in args.scenarios.split(",") if name]
+    modes = [name for name in args.modes.split(",") if name]
+    unknown = (set(scenarios) - set(SCENARIOS)) | (set(modes) - set(MODES))
+    if unknown:
+        parser.error(f"неизвестные сценарии или режимы: {', '.join(sorted(unknown))}")
+
+    # Проверка выполняется для каждого прогона; нарушение любого — код выхода 1
+    results = [run(scenario, mode, args) for scenario in scenarios for mode in modes]
+    failed = any(result["violations"] for result in results)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'сценарий':>10} {'режим':>9} {'обращ./с':>9}  исходы")
+        for result in results:
+            print(
+                f"{result['scenario']:>10} {result['mode']:>9} "
+                f"{result['contacts_per_sec']:>9}  {result['outcomes']}"
+            )
+            for violation in result["violations"]:
+                print(f"{'':>10} НАРУШЕНИЕ: {violation}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -82,7 +82,8 @@ def test_api():
     
     # 6. Просмотр лидов
     print("\n6. Просмотр лидов...")
-    leads = requests.get(f"{BASE_URL}/leads").json()
+    # Обращения лидов раскрываются явно (по умолчанию список лидов плоский)
+    leads = requests.get(f"{BASE_URL}/leads?expand=contacts").json()
     print(f"   ✓ Всего лидов: {len(leads)}")
     for lead in leads:
         contacts_count = len(lead.get('contacts', []))
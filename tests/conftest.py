@@ -0,0 +1,54 @@
+"""
+Общие настройки тестов.
+
+Приложение привязывается к БД и режиму работы при импорте, поэтому
+переменные окружения задаются здесь, до импорта app. Фоновые потоки
+(TTL, очередь без оператора) в тестах отключены.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+TEST_ENV = {
+    "CRM_CONTACT_TTL_SWEEP_INTERVAL": "0",
+    "CRM_BACKLOG_DISPATCH_INTERVAL": "0",
+}
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_db_dir = tempfile.mkdtemp(prefix="crm-tests-")
+os.environ.setdefault("CRM_DATABASE_URL", f"sqlite:///{os.path.join(_db_dir, 'crm.db')}")
+for _name, _value in TEST_ENV.items():
+    os.environ.setdefault(_name, _value)
+sys.path.insert(0, PROJECT_ROOT)
+
+
+@pytest.fixture
+def client():
+    """TestClient приложения на пустой БД"""
+    from fastapi.testclient import TestClient
+
+    from app.database import Base, engine
+    from app.main import app
+    from app.services.lead_service import lead_id_cache
+
+    Base.metadata.drop_all(bind=engine)
+    lead_id_cache.clear()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def child_env(tmp_path):
+    """Окружение дочернего процесса с приложением на отдельной БД (с переопределениями)"""
+    def make(**overrides: str) -> dict[str, str]:
+        return {
+            **os.environ,
+            **TEST_ENV,
+            "CRM_DATABASE_URL": f"sqlite:///{tmp_path / 'crm.db'}",
+            "PYTHONPATH": PROJECT_ROOT,
+            **overrides,
+        }
+    return make
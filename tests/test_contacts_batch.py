@@ -0,0 +1,33 @@
+def test_batch_results_follow_input_order(client):
+    for index in range(3):
+        response = client.post("/api/operators", json={"name": f"op{index}", "max_load": 100})
+        assert response.status_code == 201
+    for source_id, code in enumerate(("site", "bot"), 1):
+        assert client.post("/api/sources", json={"name": code, "code": code}).status_code == 201
+        response = client.post(f"/api/sources/{source_id}/operators", json={
+            "operator_weights": [{"operator_id": operator_id, "weight": 1} for operator_id in (1, 2, 3)],
+        })
+        assert response.status_code == 200
+
+    # Повторяющиеся пары, чередование источников и неизвестный источник
+    items = [
+        {"external_id": f"lead-{index % 4}", "source_code": ("site", "bot")[index % 3 == 0]}
+        for index in range(30)
+    ]
+    items.insert(7, {"external_id": "lead-0", "source_code": "unknown"})
+
+    response = client.post("/api/contacts/batch", json={"items": items})
+    assert response.status_code == 200
+    results = response.json()
+    assert len(results) == len(items)
+    assert results[7]["contact_id"] is None and results[7]["error"]
+
+    contact_ids = [result["contact_id"] for result in results if result["contact_id"] is not None]
+    assert len(set(contact_ids)) == len(items) - 1
+    for item, result in zip(items, results):
+        if item["source_code"] == "unknown":
+            continue
+        contact = client.get(f"/api/contacts/{result['contact_id']}?expand=lead,source").json()
+        assert contact["lead"]["external_id"] == item["external_id"]
+        assert contact["source"]["code"] == item["source_code"]
+        assert contact["operator_id"] == result["operator_id"]
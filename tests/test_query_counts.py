@@ -0,0 +1,87 @@
+"""
+Число SQL-запросов на горячих путях.
+
+Регрессия (N+1, запрос на каждого оператора при переборе и т.п.) видна
+как рост числа запросов, а не только времени, поэтому границы заданы точно.
+"""
+
+import pytest
+
+from app.query_stats import assert_max_queries
+
+OPERATORS = 5
+
+
+@pytest.fixture
+def source(client):
+    """Источник с OPERATORS операторами (лимит 1, равные веса)"""
+    for index in range(OPERATORS):
+        response = client.post("/api/operators", json={"name": f"op{index}", "max_load": 1})
+        assert response.status_code == 201
+    assert client.post("/api/sources", json={"name": "Сайт", "code": "site"}).status_code == 201
+    response = client.post("/api/sources/1/operators", json={
+        "operator_weights": [
+            {"operator_id": operator_id, "weight": 1} for operator_id in range(1, OPERATORS + 1)
+        ],
+    })
+    assert response.status_code == 200
+    return "site"
+
+
+def create_contact(client, external_id: str, source_code: str) -> dict:
+    response = client.post(
+        "/api/contacts", json={"external_id": external_id, "source_code": source_code}
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_create_contact_queries(client, source):
+    # Лид (поиск + вставка), резерв емкости, вставка обращения,
+    # обновление после фиксации и ответ со связями одним JOIN
+    with assert_max_queries(6):
+        contact = create_contact(client, "lead-1", source)
+    assert contact["operator"] is not None
+
+
+def test_create_contact_queries_when_source_saturated(client, source):
+    for index in range(OPERATORS):
+        create_contact(client, f"lead-{index}", source)
+
+    # После неудачного резерва емкость всех операторов читается одним
+    # запросом — число запросов не зависит от числа операторов
+    with assert_max_queries(7):
+        contact = create_contact(client, "lead-extra", source)
+    assert contact["operator_id"] is None
+
+
+def test_list_contacts_with_expand_queries(client, source):
+    for index in range(OPERATORS + 3):
+        create_contact(client, f"lead-{index}", source)
+
+    # Список и по одному selectin-запросу на связь, независимо от числа обращений
+    with assert_max_queries(4):
+        response = client.get("/api/contacts?expand=lead,source,operator")
+    assert response.status_code == 200
+    contacts = response.json()
+    assert len(contacts) == OPERATORS + 3
+    assert all(contact["lead"] and contact["source"] for contact in contacts)
+
+
+def test_failed_statement_leaves_no_timing_state():
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError
+
+    from app.query_stats import capture_queries
+
+    engine = create_engine("sqlite://")
+    with capture_queries([engine]) as capture, engine.connect() as connection:
+        info = dict(connection.info)
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM missing_table"))
+        connection.execute(text("SELECT 1"))
+        # Упавший запрос не оставляет замеров на соединении (пул его переиспользует)
+        assert connection.info == info
+    engine.dispose()
+
+    assert capture.statements == ["SELECT 1"]
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+from app.services.routing_cache import RoutingTable, routing_cache
+
+# Две параллельные записи, перестраивающие снимок маршрутизации, и поиск
+# неизвестного источника (принудительная сверка версии) в режиме CRM_DB_ASYNC
+CONCURRENT_WRITES_SCRIPT = """
+import asyncio
+import httpx
+from app.main import app, lifespan
+
+async def main():
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for index in range(2):
+                await client.post("/api/operators", json={"name": f"op{index}", "max_load": 5})
+            responses = await asyncio.gather(
+                client.patch("/api/operators/1", json={"max_load": 7}),
+                client.patch("/api/operators/2", json={"max_load": 7}),
+                client.post("/api/contacts", json={"external_id": "lead", "source_code": "unknown"}),
+            )
+            print(*[response.status_code for response in responses])
+
+asyncio.run(main())
+"""
+
+
+def test_concurrent_writes_do_not_block_event_loop_in_async_mode(child_env):
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", CONCURRENT_WRITES_SCRIPT],
+        env=child_env(CRM_DB_ASYNC="1"),
+        capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["200", "200", "400"]
+
+
+def test_refresh_keeps_newer_snapshot(client, monkeypatch):
+    from app.database import SessionLocal
+
+    newer = RoutingTable(version=10**6)
+    monkeypatch.setattr(routing_cache, "_table", newer)
+    with SessionLocal() as db:
+        assert routing_cache.refresh(db) is newer
@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+SIMULATION = {
+    "arrival_rates": [1.0],
+    "mean_handling_time_seconds": 300,
+    "duration_seconds": 3600,
+    "seed": 1,
+}
+STRATEGIES = ["weighted_random", "headroom", "smooth_round_robin"]
+
+
+@pytest.fixture
+def source_id(client):
+    assert client.post("/api/operators", json={"name": "op", "max_load": 5}).status_code == 201
+    assert client.post("/api/sources", json={"name": "Сайт", "code": "site"}).status_code == 201
+    return 1
+
+
+def simulate(client, source_id: int, **overrides) -> dict:
+    response = client.post(f"/api/sources/{source_id}/simulate", json={**SIMULATION, **overrides})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_simulation_without_operators_leaves_contacts_unassigned(client, source_id, strategy):
+    result = simulate(client, source_id, operator_weights=[], strategy=strategy)
+
+    assert result["contacts"] > 0
+    assert result["assigned"] == 0
+    assert result["unassigned_rate"] == 1.0
+    assert result["operators"] == []
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_simulation_with_zero_total_weight_leaves_contacts_unassigned(client, source_id, strategy):
+    # Неактивный оператор остается в маршруте с нулевым весом выборки
+    assert client.patch("/api/operators/1", json={"is_active": False}).status_code == 200
+
+    result = simulate(
+        client, source_id, operator_weights=[{"operator_id": 1, "weight": 3}], strategy=strategy
+    )
+
+    assert result["contacts"] > 0
+    assert result["assigned"] == 0
+    assert result["unassigned_rate"] == 1.0
+    assert [operator["expected_share"] for operator in result["operators"]] == [0.0]
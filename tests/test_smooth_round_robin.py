@@ -0,0 +1,40 @@
+import contextvars
+from collections import Counter
+
+from app.services.distribution import SmoothWeightedRoundRobinStrategy
+from app.services.routing_cache import RouteOperator, SourceRoute
+
+ROUTE = SourceRoute(
+    source_id=1,
+    code="site",
+    strategy="smooth_round_robin",
+    operators=(
+        RouteOperator(1, 1, 10, True),
+        RouteOperator(2, 3, 10, True),
+        RouteOperator(3, 2, 10, True),  # без емкости: резерв всегда неудачен
+    ),
+    version=1,
+)
+FULL = ROUTE.operators[2]
+
+
+def assign(strategy, requests):
+    """Выбор для пачки параллельных запросов: сначала все select, затем все повторы"""
+    selected = [request.run(strategy.select, ROUTE) for request in requests]
+    return [
+        request.run(strategy.reselect, ROUTE, operator, {FULL}) if operator is FULL else operator
+        for request, operator in zip(requests, selected)
+    ]
+
+
+def test_concurrent_retries_keep_weight_shares():
+    strategy = SmoothWeightedRoundRobinStrategy()
+    counts = Counter()
+    for _ in range(400):
+        requests = [contextvars.copy_context() for _ in range(2)]
+        counts.update(operator.operator_id for operator in assign(strategy, requests))
+
+    # Оператор без емкости исключен: доли остальных — 1:3, как у их весов
+    # (с точностью до незавершенного раунда)
+    assert sum(counts.values()) == 800
+    assert abs(counts[1] - 200) <= 2